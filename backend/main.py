@@ -5,55 +5,481 @@ Serves processed player tendency data from JSON files.
 import os
 import json
 import glob
+import time
+import base64
+import itertools
+import hashlib
+import threading
 from pathlib import Path
-from typing import Optional
+from contextvars import ContextVar
+from contextlib import asynccontextmanager
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Iterable, Iterator, Optional
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the dataset now so its cache warmup starts before the first
+    # request; the warmup runs in the background and never blocks startup
+    current_dataset()
+    yield
+    _popularity.flush()
+
+
 app = FastAPI(
     title="CricketTendencies API",
     description="Cricket player tendency data — batting & bowling analysis",
     version="1.0.0",
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://localhost:3000", "*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    lifespan=lifespan,
 )
 
 BASE_DIR = Path(__file__).parent.parent
-PROCESSED_DIR = BASE_DIR / "data" / "processed"
+# Data root to serve; point it at data/synthetic to load-test generate_sample.py output
+PROCESSED_DIR = Path(os.environ.get("PROCESSED_DIR", BASE_DIR / "data" / "processed"))
 SAMPLE_DIR = PROCESSED_DIR / "sample"
+GENERATIONS_DIR = PROCESSED_DIR / "generations"
+CURRENT_POINTER = PROCESSED_DIR / "CURRENT"
+
+# Page sizes for the list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Ball-level query endpoint: groupable columns and cached results per generation/format
+QUERY_GROUPS = [
+    "striker", "bowler", "batting_team", "bowling_team", "venue", "season", "innings", "over", "phase",
+    "striker_hand", "bowler_type", "bowler_arm",
+]
+QUERY_CACHE_SIZE = 256
+# Dismissals not credited to the bowler
+NON_BOWLER_WICKETS = ["run out", "retired hurt", "obstructing the field"]
+
+# Cache-Control for responses whose URL is pinned to the current generation
+# (?v=<generation>, as handed out by /api/bootstrap) vs. unpinned ones
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+# How often (seconds) requests re-check the CURRENT pointer for a new generation
+POINTER_CHECK_INTERVAL = 1.0
+
+# Parsed player payloads kept in memory per generation
+PAYLOAD_CACHE_SIZE = 2048
+# Most-viewed (player, format, role) keys persisted and preloaded on startup,
+# and how often (seconds) the view counts are written out
+POPULARITY_TOP_N = 500
+POPULARITY_FLUSH_INTERVAL = 60.0
+POPULARITY_FILE = Path(os.environ.get("POPULARITY_FILE", PROCESSED_DIR / "popularity.json"))
+
+
+class Dataset:
+    """
+    One published data generation: its directory and parsed index.
+    Handlers take a single reference per request, so a swap mid-request
+    never mixes files from two generations.
+    """
+
+    def __init__(self, generation: str, data_dir: Path):
+        self.generation = generation
+        self.data_dir = data_dir
+        idx_path = data_dir / "index.json"
+        self.index: dict = {}
+        if idx_path.exists():
+            with open(idx_path) as f:
+                self.index = json.load(f)
+        self._stores: dict[str, Optional[DeliveryStore]] = {}
+        self._stores_lock = threading.Lock()
+        self._similar: dict[tuple[str, str], Optional[SimilarIndex]] = {}
+        self._payloads: OrderedDict = OrderedDict()
+        self._payloads_lock = threading.Lock()
+        self._search: Optional[list[tuple[str, dict]]] = None
+        self._search_lock = threading.Lock()
+        self._teams: Optional[dict[str, Path]] = None
+
+    def payload(self, fname: str) -> Optional[dict]:
+        """A player file's parsed JSON, kept in an LRU cache that dies with the generation."""
+        with self._payloads_lock:
+            if fname in self._payloads:
+                self._payloads.move_to_end(fname)
+                return self._payloads[fname]
+        path = self.data_dir / fname
+        if not path.exists():
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        with self._payloads_lock:
+            self._payloads[fname] = data
+            if len(self._payloads) > PAYLOAD_CACHE_SIZE:
+                self._payloads.popitem(last=False)
+        return data
+
+    def search_entries(self) -> list[tuple[str, dict]]:
+        """Every (player, format, role) once, in index order, with its lowercased name."""
+        if self._search is None:
+            with self._search_lock:
+                if self._search is None:
+                    entries: list[tuple[str, dict]] = []
+                    seen: set = set()
+                    for team, formats_data in self.index.items():
+                        for fmt, roles_data in formats_data.items():
+                            for role_key, players in roles_data.items():
+                                inferred_role = "batter" if role_key == "batters" else "bowler"
+                                for player in players:
+                                    key = (player, fmt, inferred_role)
+                                    if key not in seen:
+                                        seen.add(key)
+                                        entries.append((player.lower(), {
+                                            "name": player,
+                                            "team": team,
+                                            "format": fmt,
+                                            "role": inferred_role,
+                                        }))
+                    self._search = entries
+        return self._search
+
+    def team_file(self, slug: str) -> Optional[Path]:
+        """Path of a team profile by slug, looked up among the files this generation published."""
+        if self._teams is None:
+            teams_dir = self.data_dir / "teams"
+            files = teams_dir.glob("*.json") if teams_dir.is_dir() else []
+            self._teams = {path.stem: path for path in files}
+        return self._teams.get(slug)
+
+    def store(self, fmt: str) -> Optional["DeliveryStore"]:
+        """Memory-mapped ball-level store for a format, opened on first use."""
+        if fmt not in self._stores:
+            with self._stores_lock:
+                if fmt not in self._stores:
+                    store_dir = self.data_dir / "deliveries" / fmt
+                    self._stores[fmt] = DeliveryStore(store_dir) if (store_dir / "meta.json").exists() else None
+        return self._stores[fmt]
+
+    def similar(self, fmt: str, role: str) -> Optional["SimilarIndex"]:
+        """Similar-player index for a format and role, opened on first use."""
+        key = (fmt, role)
+        if key not in self._similar:
+            with self._stores_lock:
+                if key not in self._similar:
+                    index_dir = self.data_dir / "similar" / f"{fmt}_{role}"
+                    self._similar[key] = SimilarIndex(index_dir) if (index_dir / "names.json").exists() else None
+        return self._similar[key]
+
+
+class SimilarIndex:
+    """
+    Read-only view of one format/role's feature vectors and precomputed
+    neighbour lists (written by scraper/similarity.py). Vectors are
+    L2-normalised, so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, index_dir: Path):
+        with open(index_dir / "names.json") as f:
+            meta = json.load(f)
+        self.names: list[str] = meta["names"]
+        self.teams: list[str] = meta["teams"]
+        self.features: list[str] = meta["features"]
+        self.rows: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.vectors = np.load(index_dir / "vectors.npy", mmap_mode="r")
+        self.neighbours = np.load(index_dir / "neighbours.npy", mmap_mode="r")
+        self.scores = np.load(index_dir / "scores.npy", mmap_mode="r")
+
+    def top(self, row: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """The k most similar rows to `row`, best first."""
+        if k <= self.neighbours.shape[1]:
+            return self.neighbours[row, :k], self.scores[row, :k]
+        sims = self.vectors @ self.vectors[row]
+        sims[row] = -np.inf
+        k = min(k, len(sims) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-sims, k - 1)[:k]
+        order = np.argsort(-sims[top], kind="stable")
+        return top[order], sims[top[order]]
+
+
+class DeliveryStore:
+    """
+    Read-only view of one format's ball-level columns (written by
+    scraper/store.py). Columns are np.memmap'd, so only the pages a query
+    touches are read, and results are kept in a small LRU cache that dies
+    with the generation.
+    """
+
+    def __init__(self, store_dir: Path):
+        with open(store_dir / "meta.json") as f:
+            meta = json.load(f)
+        self.rows: int = meta["rows"]
+        self.columns: dict[str, np.ndarray] = {
+            col: (
+                np.memmap(store_dir / f"{col}.bin", dtype=dtype, mode="r", shape=(self.rows,))
+                if self.rows else np.empty(0, dtype=dtype)
+            )
+            for col, dtype in meta["columns"].items()
+        }
+        self.column_vocabs: dict[str, str] = meta["column_vocabs"]
+        self.labels: dict[str, list[str]] = meta["vocabs"]
+        self.codes: dict[str, dict[str, int]] = {
+            name: {label: i for i, label in enumerate(labels)} for name, labels in self.labels.items()
+        }
+        # Per-player row positions (CSR) for the striker/bowler columns
+        self.row_index: dict[str, tuple[np.ndarray, np.ndarray]] = {
+            col: (
+                np.fromfile(store_dir / f"{col}_offsets.bin", dtype=np.int64),
+                np.memmap(store_dir / f"{col}_rows.bin", dtype=np.int64, mode="r") if self.rows else np.empty(0, dtype=np.int64),
+            )
+            for col in meta.get("row_index", [])
+        }
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def code(self, col: str, label: str) -> int:
+        """Integer code of `label` in a coded column, or -2 (matches nothing) if unknown."""
+        return self.codes[self.column_vocabs[col]].get(label, -2)
+
+    def player_rows(self, col: str, label: str) -> np.ndarray:
+        """Sorted rows where an indexed player column equals `label`."""
+        offsets, rows = self.row_index[col]
+        code = self.code(col, label)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return np.asarray(rows[offsets[code]:offsets[code + 1]])
+
+    def label(self, col: str, code: int) -> Any:
+        if col not in self.column_vocabs:
+            return int(code)
+        return self.labels[self.column_vocabs[col]][code] if code >= 0 else None
+
+    def cached(self, key: tuple, compute: Callable[[], dict]) -> dict:
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = compute()
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+
+class Popularity:
+    """
+    View counts per (player, format, role). The top POPULARITY_TOP_N are
+    written to POPULARITY_FILE at most every POPULARITY_FLUSH_INTERVAL and
+    on shutdown, and read back on startup to choose what to preload.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        try:
+            with open(path) as f:
+                for entry in json.load(f)["players"]:
+                    self.counts[(entry["name"], entry["format"], entry["role"])] += entry["views"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def hit(self, name: str, fmt: str, role: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.counts[(name, fmt, role)] += 1
+            due = now - self._last_flush >= POPULARITY_FLUSH_INTERVAL
+            if due:
+                self._last_flush = now
+        if due:
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def top(self, n: int = POPULARITY_TOP_N) -> list[tuple[str, str, str]]:
+        with self._lock:
+            return [key for key, _ in self.counts.most_common(n)]
+
+    def flush(self) -> None:
+        with self._lock:
+            players = [
+                {"name": name, "format": fmt, "role": role, "views": views}
+                for (name, fmt, role), views in self.counts.most_common(POPULARITY_TOP_N)
+            ]
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"players": players}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # read-only filesystem (e.g. serverless): counts stay in memory
+
+
+def player_filename(name: str, fmt: str, role: str) -> str:
+    slug = name.lower().replace(" ", "_")
+    role_short = "bat" if role == "batter" else "bowl"
+    return f"{slug}_{fmt}_{role_short}.json"
+
+
+def warm(dataset: Dataset) -> None:
+    """Preload the search list and the most-viewed player payloads into a dataset's caches."""
+    dataset.search_entries()
+    for name, fmt, role in _popularity.top():
+        if _dataset is not dataset:
+            return  # superseded by a newer generation
+        dataset.payload(player_filename(name, fmt, role))
+
+
+_popularity = Popularity(POPULARITY_FILE)
+_dataset: Optional[Dataset] = None
+_last_check = 0.0
+_swap_lock = threading.Lock()
+_request_dataset: ContextVar[Optional[Dataset]] = ContextVar("_request_dataset", default=None)
+
+
+def resolve_generation() -> tuple[str, Path]:
+    """
+    Locate the data to serve: the generation named by CURRENT, else a
+    legacy in-place index, else the bundled sample.
+    """
+    if CURRENT_POINTER.exists():
+        gen = CURRENT_POINTER.read_text().strip()
+        gen_dir = GENERATIONS_DIR / gen
+        if gen and (gen_dir / "index.json").exists():
+            return gen, gen_dir
+    legacy_index = PROCESSED_DIR / "index.json"
+    if legacy_index.exists():
+        return f"legacy-{legacy_index.stat().st_mtime_ns}", PROCESSED_DIR
+    sample_index = SAMPLE_DIR / "index.json"
+    if sample_index.exists():
+        return f"sample-{sample_index.stat().st_mtime_ns}", SAMPLE_DIR
+    return "sample", SAMPLE_DIR
+
+
+def current_dataset() -> Dataset:
+    """
+    Return the live dataset, swapping in a newly published generation if
+    any. Inside a request this is the dataset pinned by the caching
+    middleware, so the ETag and the body always describe the same data.
+    """
+    global _dataset, _last_check
+    pinned = _request_dataset.get()
+    if pinned is not None:
+        return pinned
+    now = time.monotonic()
+    if _dataset is not None and now - _last_check < POINTER_CHECK_INTERVAL:
+        return _dataset
+    with _swap_lock:
+        if _dataset is None or now - _last_check >= POINTER_CHECK_INTERVAL:
+            gen, data_dir = resolve_generation()
+            if _dataset is None or _dataset.generation != gen:
+                # Build fully before publishing the reference
+                _dataset = Dataset(gen, data_dir)
+                threading.Thread(target=warm, args=(_dataset,), daemon=True).start()
+            _last_check = now
+        return _dataset
 
 
 def has_real_data() -> bool:
-    """Check if processed real data (non-sample) index exists."""
-    return (PROCESSED_DIR / "index.json").exists()
+    """Check if processed real data (non-sample) is being served."""
+    return not current_dataset().generation.startswith("sample")
 
 
 def load_index() -> dict:
-    if has_real_data():
-        idx_path = PROCESSED_DIR / "index.json"
-    else:
-        idx_path = SAMPLE_DIR / "index.json"
-    if idx_path.exists():
-        with open(idx_path) as f:
-            return json.load(f)
-    return {}
-
-
-def load_player_file(slug: str, fmt: str, role: str) -> Optional[dict]:
-    data_dir = PROCESSED_DIR if has_real_data() else SAMPLE_DIR
-    fname = f"{slug}_{fmt}_{role}.json"
-    path = data_dir / fname
-    if path.exists():
-        with open(path) as f:
-            return json.load(f)
-    return None
+    return current_dataset().index
+
+
+def encode_cursor(offset: int, dataset: Dataset) -> str:
+    """Opaque page cursor, pinned to the generation it was issued against."""
+    raw = json.dumps({"g": dataset.generation, "o": offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], dataset: Dataset) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        generation, offset = payload["g"], int(payload["o"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if generation != dataset.generation:
+        raise HTTPException(status_code=410, detail="Cursor expired — data was republished, restart from the first page")
+    return offset
+
+
+def paginate(items: Iterator, offset: int, limit: int, dataset: Dataset) -> tuple[list, Optional[str]]:
+    """Take one page from `items`, peeking one past it to decide whether more remain."""
+    page = list(itertools.islice(items, offset, offset + limit + 1))
+    if len(page) > limit:
+        return page[:limit], encode_cursor(offset + limit, dataset)
+    return page, None
+
+
+def ndjson_response(rows: Iterable[dict]) -> StreamingResponse:
+    """Stream rows as newline-delimited JSON, one line at a time."""
+    return StreamingResponse((json.dumps(row) + "\n" for row in rows), media_type="application/x-ndjson")
+
+
+def generation_etag(request: Request, dataset: Dataset) -> str:
+    """Strong validator: the URL's representation only changes with the generation."""
+    url_hash = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode()).hexdigest()[:16]
+    return f'"{dataset.generation}-{url_hash}"'
+
+
+def count_view(request: Request) -> None:
+    """
+    Count a served player view for the popularity list. Done here rather
+    than in the handler so revalidated (304) views of cached players count too.
+    """
+    if request.url.path == "/api/player":
+        params = request.query_params
+        name, fmt, role = params.get("name"), params.get("format"), params.get("role")
+        if name and fmt and role:
+            _popularity.hit(name, fmt, role)
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """
+    Pin one dataset per request, answer If-None-Match with 304 before the
+    handler runs, and tag successful /api reads with ETag and Cache-Control.
+    """
+    if request.method != "GET" or not request.url.path.startswith("/api/"):
+        return await call_next(request)
+
+    dataset = current_dataset()
+    token = _request_dataset.set(dataset)
+    try:
+        etag = generation_etag(request, dataset)
+        pinned = request.query_params.get("v") == dataset.generation
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if pinned else REVALIDATE_CACHE_CONTROL,
+        }
+        if etag in request.headers.get("if-none-match", ""):
+            count_view(request)
+            return Response(status_code=304, headers=headers)
+        response = await call_next(request)
+        if response.status_code == 200:
+            count_view(request)
+            response.headers.update(headers)
+        return response
+    finally:
+        _request_dataset.reset(token)
+
+
+# Added after conditional_get so it is the outer layer: 304s answered
+# there still get CORS headers
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173", "http://localhost:3000", "*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
 
 @app.get("/")
@@ -75,13 +501,39 @@ def get_teams():
     return {"teams": sorted(teams, key=lambda t: t["name"])}
 
 
+@app.get("/api/bootstrap")
+def get_bootstrap():
+    """
+    Everything the frontend needs on first load in one response: teams,
+    formats and the full roster index, plus the generation id to pin
+    later requests with ?v= so they can be cached as immutable.
+    """
+    dataset = current_dataset()
+    return {
+        "generation": dataset.generation,
+        "teams": get_teams()["teams"],
+        "formats": get_formats()["formats"],
+        "index": dataset.index,
+    }
+
+
 @app.get("/api/players")
-def get_players(team: str, format: str, role: str):
+def get_players(
+    team: str,
+    format: str,
+    role: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+):
     """
     List players for a given team/format/role.
     role: 'batter' or 'bowler'
+    Pass `limit` (and the returned `next_cursor`) to page through large
+    rosters, or `stream=true` for an NDJSON export.
     """
-    index = load_index()
+    dataset = current_dataset()
+    index = dataset.index
     if team not in index:
         raise HTTPException(status_code=404, detail=f"Team '{team}' not found")
     if format not in index[team]:
@@ -89,7 +541,15 @@ def get_players(team: str, format: str, role: str):
 
     role_key = "batters" if role == "batter" else "bowlers"
     players = index[team][format].get(role_key, [])
-    return {"players": players, "team": team, "format": format, "role": role}
+
+    if stream:
+        return ndjson_response({"name": p, "team": team, "format": format, "role": role} for p in players)
+    if limit is None and cursor is None:
+        return {"players": players, "team": team, "format": format, "role": role}
+
+    offset = decode_cursor(cursor, dataset)
+    page, next_cursor = paginate(iter(players), offset, limit or DEFAULT_PAGE_SIZE, dataset)
+    return {"players": page, "team": team, "format": format, "role": role, "next_cursor": next_cursor}
 
 
 @app.get("/api/player")
@@ -100,9 +560,7 @@ def get_player(name: str, format: str, role: str):
     format: tests | odis | t20is | ipl
     role: batter | bowler
     """
-    slug = name.lower().replace(" ", "_")
-    role_short = "bat" if role == "batter" else "bowl"
-    data = load_player_file(slug, format, role_short)
+    data = current_dataset().payload(player_filename(name, format, role))
 
     if data is None:
         raise HTTPException(
@@ -113,6 +571,26 @@ def get_player(name: str, format: str, role: str):
     return data
 
 
+@app.get("/api/team")
+def get_team(name: str, format: Optional[str] = None):
+    """
+    Team tendency profile: run rate, dot %, boundary %, wickets and
+    dismissal mix overall and by phase, batting and bowling.
+    Optionally narrowed to one format.
+    """
+    path = current_dataset().team_file(name.lower().replace(" ", "_"))
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No team profile for {name}")
+    with open(path) as f:
+        data = json.load(f)
+
+    if format is None:
+        return data
+    if format not in data["formats"]:
+        raise HTTPException(status_code=404, detail=f"Format '{format}' not available for {name}")
+    return {"name": data["name"], "format": format, **data["formats"][format]}
+
+
 @app.get("/api/formats")
 def get_formats():
     return {
@@ -127,36 +605,211 @@ def get_formats():
     }
 
 
+def iter_search(entries: list[tuple[str, dict]], q_lower: str, format: Optional[str], role: Optional[str]) -> Iterator[dict]:
+    """Yield matching players lazily, in index order, without duplicates."""
+    for name_lower, entry in entries:
+        if format and entry["format"] != format:
+            continue
+        if role and entry["role"] != role:
+            continue
+        if q_lower in name_lower:
+            yield entry
+
+
 @app.get("/api/search")
-def search_players(q: str = "", format: Optional[str] = None, role: Optional[str] = None, limit: int = 30):
-    """Search players by name substring across all teams."""
+def search_players(
+    q: str = "",
+    format: Optional[str] = None,
+    role: Optional[str] = None,
+    limit: int = Query(30, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+):
+    """
+    Search players by name substring across all teams.
+    Follow `next_cursor` for further pages, or pass `stream=true` for
+    every match as NDJSON.
+    """
     if not q or len(q) < 2:
-        return {"results": []}
+        return ndjson_response([]) if stream else {"results": [], "next_cursor": None}
 
-    index = load_index()
-    results = []
-    seen: set = set()
-    q_lower = q.lower()
-
-    for team, formats_data in index.items():
-        for fmt, roles_data in formats_data.items():
-            if format and fmt != format:
-                continue
-            for role_key, players in roles_data.items():
-                inferred_role = "batter" if role_key == "batters" else "bowler"
-                if role and inferred_role != role:
-                    continue
-                for player in players:
-                    key = (player, fmt, inferred_role)
-                    if q_lower in player.lower() and key not in seen:
-                        seen.add(key)
-                        results.append({
-                            "name": player,
-                            "team": team,
-                            "format": fmt,
-                            "role": inferred_role,
-                        })
-                        if len(results) >= limit:
-                            return {"results": results}
-
-    return {"results": results}
+    dataset = current_dataset()
+    matches = iter_search(dataset.search_entries(), q.lower(), format, role)
+    if stream:
+        return ndjson_response(matches)
+
+    offset = decode_cursor(cursor, dataset)
+    results, next_cursor = paginate(matches, offset, limit, dataset)
+    return {"results": results, "next_cursor": next_cursor}
+
+
+def aggregate_deliveries(store: DeliveryStore, filters: tuple, group_by: Optional[str], min_balls: int, limit: int) -> dict:
+    """
+    Filter the ball-level columns and aggregate them per group with
+    bincount. A batter or bowler filter starts from that player's rows in
+    the row index instead of scanning every delivery.
+    """
+    cols = store.columns
+    idx = None
+    for col, value in filters:
+        if col in store.row_index:
+            rows = store.player_rows(col, value)
+            idx = rows if idx is None else np.intersect1d(idx, rows, assume_unique=True)
+
+    # Without a row-index filter, compare whole memmapped columns and select
+    # once with the resulting mask (or not at all) instead of gathering
+    # every column through an arange
+    def view(col: str) -> np.ndarray:
+        return cols[col] if idx is None else cols[col][idx]
+
+    mask = None
+    for col, value in filters:
+        if col in ("over_from", "season_from"):
+            cond = view(col.split("_")[0]) >= value
+        elif col in ("over_to", "season_to"):
+            cond = view(col.split("_")[0]) <= value
+        elif col in store.row_index:
+            continue
+        elif col in store.column_vocabs:
+            cond = view(col) == store.code(col, value)
+        else:
+            cond = view(col) == value
+        mask = cond if mask is None else mask & cond
+
+    if idx is None:
+        idx = slice(None) if mask is None else mask
+    elif mask is not None:
+        idx = idx[mask]
+
+    runs = cols["runs_off_bat"][idx].astype(np.int64)
+    if group_by:
+        keys = cols[group_by][idx].astype(np.int64)
+        base = int(keys.min()) if len(keys) else 0
+        groups = keys
+        groups -= base
+    else:
+        base = 0
+        groups = np.zeros(len(runs), dtype=np.int64)
+    size = int(groups.max()) + 1 if len(groups) else 0
+
+    # One unweighted bincount over (group, runs off the bat) pairs gives
+    # deliveries, runs, fours, sixes and dots together; flag metrics count
+    # only their own rows, which is far cheaper than weighted passes
+    span = max(7, int(runs.max()) + 1 if len(runs) else 0)
+    codes = groups * span
+    codes += runs
+    by_runs = np.bincount(codes, minlength=size * span).reshape(size, span)
+    deliveries = by_runs.sum(axis=1)
+    run_sums = by_runs @ np.arange(span)
+    extras = cols["extras"][idx]
+    scored = extras != 0
+    wt = cols["wicket_type"][idx]
+    fell = np.flatnonzero(wt >= 0)
+    non_bowler = [store.code("wicket_type", w) for w in NON_BOWLER_WICKETS]
+
+    def count(flags: np.ndarray) -> np.ndarray:
+        return np.bincount(groups[flags], minlength=size)
+
+    sums = {
+        "balls": deliveries - count(cols["legal"][idx] == 0),
+        "runs": run_sums,
+        "runs_conceded": run_sums + np.bincount(groups[scored], weights=extras[scored], minlength=size).astype(np.int64),
+        "fours": by_runs[:, 4],
+        "sixes": by_runs[:, 6],
+        "dots": by_runs[:, 0],
+        "dismissals": count(cols["player_dismissed"][idx] == cols["striker"][idx]),
+        "wickets": np.bincount(groups[fell[~np.isin(wt[fell], non_bowler)]], minlength=size),
+    }
+
+    present = np.flatnonzero((deliveries > 0) & (sums["balls"] >= min_balls))
+    order = present[np.argsort(-sums["balls"][present], kind="stable")][:limit]
+    rows = []
+    for g in order:
+        row: dict[str, Any] = {name: int(values[g]) for name, values in sums.items()}
+        if group_by:
+            row = {group_by: store.label(group_by, int(g) + base), **row}
+        balls, dismissals = row["balls"], row["dismissals"]
+        row["strike_rate"] = round(row["runs"] / balls * 100, 2) if balls else 0
+        row["average"] = round(row["runs"] / dismissals, 2) if dismissals else None
+        row["economy"] = round(row["runs_conceded"] / (balls / 6), 2) if balls else 0
+        rows.append(row)
+    return {"matched": int(len(runs)), "groups": int(len(present)), "results": rows}
+
+
+@app.get("/api/query")
+def query_deliveries(
+    format: str,
+    group_by: Optional[str] = None,
+    batter: Optional[str] = None,
+    bowler: Optional[str] = None,
+    batting_team: Optional[str] = None,
+    bowling_team: Optional[str] = None,
+    venue: Optional[str] = None,
+    phase: Optional[str] = None,
+    innings: Optional[int] = None,
+    over_from: Optional[int] = None,
+    over_to: Optional[int] = None,
+    season_from: Optional[int] = None,
+    season_to: Optional[int] = None,
+    batting_hand: Optional[str] = None,
+    bowling_type: Optional[str] = None,
+    bowling_arm: Optional[str] = None,
+    min_balls: int = 0,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Ad-hoc aggregates over the ball-level store.
+    e.g. strike rate in overs 16-20 against a team in chases:
+    /api/query?format=t20is&group_by=striker&bowling_team=India&innings=2&over_from=16&over_to=20
+    batting_hand (right/left), bowling_type (pace/spin) and bowling_arm
+    (right/left) filter on the player-metadata join.
+    """
+    if group_by and group_by not in QUERY_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(QUERY_GROUPS)}")
+    dataset = current_dataset()
+    store = dataset.store(format)
+    if store is None:
+        raise HTTPException(status_code=404, detail=f"No ball-level data for format '{format}'")
+
+    requested = {
+        "striker": batter, "bowler": bowler, "batting_team": batting_team, "bowling_team": bowling_team,
+        "venue": venue, "phase": phase, "innings": innings,
+        "over_from": over_from, "over_to": over_to, "season_from": season_from, "season_to": season_to,
+        "striker_hand": batting_hand, "bowler_type": bowling_type, "bowler_arm": bowling_arm,
+    }
+    filters = tuple(sorted((k, v) for k, v in requested.items() if v is not None))
+    # Stores from older generations may predate some columns
+    needed = {group_by} | {k.split("_")[0] if k.endswith(("_from", "_to")) else k for k, _ in filters}
+    missing = sorted(c for c in needed - {None} if c not in store.columns)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Not available in this generation: {', '.join(missing)}")
+    key = (filters, group_by, min_balls, limit)
+    result = store.cached(key, lambda: aggregate_deliveries(store, filters, group_by, min_balls, limit))
+    return {"format": format, "group_by": group_by, "filters": dict(filters), **result}
+
+
+@app.get("/api/similar")
+def get_similar(name: str, format: str, role: str, k: int = Query(10, ge=1, le=MAX_PAGE_SIZE)):
+    """
+    Players who bat (or bowl) most like `name` in a format, by cosine
+    similarity of phase rates, dot/boundary % and the dismissal or
+    wicket-type mix (the simulated wagon wheels and pitch maps are left out).
+    """
+    index = current_dataset().similar(format, role)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No similarity index for {role}s in {format}")
+    row = index.rows.get(name)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"No {role} data found for {name} in {format}")
+
+    ids, scores = index.top(row, k)
+    return {
+        "name": name,
+        "team": index.teams[row],
+        "format": format,
+        "role": role,
+        "results": [
+            {"name": index.names[i], "team": index.teams[i], "score": round(float(score), 4)}
+            for i, score in zip(ids, scores)
+        ],
+    }
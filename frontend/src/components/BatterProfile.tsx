@@ -6,6 +6,7 @@ import WagonWheel from './WagonWheel';
 import PhaseChart from './PhaseChart';
 import DismissalChart from './DismissalChart';
 import VsTypeChart from './VsTypeChart';
+import ProgressionChart from './ProgressionChart';
 
 interface Props { data: BatterData; }
 
@@ -26,7 +27,7 @@ const Card = ({ children, style }: { children: React.ReactNode; style?: React.CS
 
 export default function BatterProfile({ data }: Props) {
   const [pitchMetric] = useState<'strike_rate' | 'average'>('strike_rate');
-  const { stats, phases, dismissals_breakdown, wagon_wheel, vs_pace, vs_spin, vs_left_arm, vs_right_arm } = data;
+  const { stats, phases, dismissals_breakdown, wagon_wheel, vs_pace, vs_spin, vs_left_arm, vs_right_arm, progression } = data;
 
   const vsRadarData = [
     { subject: 'vs Pace SR', value: vs_pace.strike_rate, fullMark: 200 },
@@ -105,6 +106,23 @@ export default function BatterProfile({ data }: Props) {
         </Card>
       </div>
 
+      {/* Strike rate and dismissal risk through the innings */}
+      {progression && (
+        <Card style={{ marginBottom: 32 }}>
+          <h3 style={{ fontSize: 12, fontWeight: 700, textTransform: 'uppercase', letterSpacing: '0.06em', color: '#64748b', marginBottom: 12 }}>
+            Innings Progression (by Balls Faced)
+          </h3>
+          <ProgressionChart
+            labels={progression.balls.map((_, i) =>
+              i === progression.balls.length - 1 ? `${i * progression.bucket + 1}+` : `${i * progression.bucket + 1}-${(i + 1) * progression.bucket}`)}
+            rate={progression.strike_rate}
+            hazard={progression.hazard}
+            rateLabel="Strike Rate"
+            hazardLabel="Dismissal % per ball"
+          />
+        </Card>
+      )}
+
       {/* Dismissals + vs type */}
       <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: 20, marginBottom: 32 }}>
         <Card>
@@ -4,6 +4,7 @@ import StatCard from './StatCard';
 import PitchMap from './PitchMap';
 import PhaseChart from './PhaseChart';
 import DismissalChart from './DismissalChart';
+import ProgressionChart from './ProgressionChart';
 import { useState } from 'react';
 
 interface Props { data: BowlerData; }
@@ -27,7 +28,7 @@ type PitchMetric = 'balls' | 'wickets' | 'economy';
 
 export default function BowlerProfile({ data }: Props) {
   const [pitchMetric, setPitchMetric] = useState<PitchMetric>('balls');
-  const { stats, phases, wicket_types, pitch_map, vs_rhb, vs_lhb } = data;
+  const { stats, phases, wicket_types, pitch_map, vs_rhb, vs_lhb, spells } = data;
 
   const totalWickets = Object.values(wicket_types).reduce((s, v) => s + v, 0);
 
@@ -108,6 +109,23 @@ export default function BowlerProfile({ data }: Props) {
         </Card>
       </div>
 
+      {/* Economy and wicket threat through a spell */}
+      {spells && (
+        <Card style={{ marginBottom: 32 }}>
+          <h3 style={{ fontSize: 12, fontWeight: 700, textTransform: 'uppercase', letterSpacing: '0.06em', color: '#64748b', marginBottom: 12 }}>
+            Spell Progression (by Over of Spell)
+          </h3>
+          <ProgressionChart
+            labels={spells.balls.map((_, i) => (i === spells.balls.length - 1 ? `${i + 1}+` : `${i + 1}`))}
+            rate={spells.economy}
+            hazard={spells.hazard}
+            rateLabel="Economy"
+            hazardLabel="Wicket % per ball"
+            color="#3b82f6"
+          />
+        </Card>
+      )}
+
       {/* Wicket types + vs handedness */}
       <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: 20, marginBottom: 32 }}>
         <Card>
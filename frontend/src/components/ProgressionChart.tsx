@@ -0,0 +1,37 @@
+import {
+  LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend,
+} from 'recharts';
+
+interface Props {
+  labels: string[];
+  rate: (number | null)[];
+  hazard: (number | null)[];
+  rateLabel: string;
+  hazardLabel: string;
+  color?: string;
+}
+
+export default function ProgressionChart({ labels, rate, hazard, rateLabel, hazardLabel, color = '#22c55e' }: Props) {
+  const data = labels
+    .map((label, i) => ({ label, rate: rate[i], hazard: hazard[i] }))
+    .filter(d => d.rate !== null);
+
+  if (!data.length) return null;
+
+  return (
+    <div style={{ width: '100%', height: 200 }}>
+      <ResponsiveContainer>
+        <LineChart data={data} margin={{ top: 8, right: 8, left: -10, bottom: 0 }}>
+          <CartesianGrid vertical={false} stroke="#1e293b" />
+          <XAxis dataKey="label" tick={{ fill: '#64748b', fontSize: 11 }} axisLine={false} tickLine={false} />
+          <YAxis yAxisId="rate" tick={{ fill: '#64748b', fontSize: 11 }} axisLine={false} tickLine={false} />
+          <YAxis yAxisId="hazard" orientation="right" unit="%" tick={{ fill: '#64748b', fontSize: 11 }} axisLine={false} tickLine={false} />
+          <Tooltip contentStyle={{ background: '#1a2438', border: '1px solid #1e293b', borderRadius: 8 }} />
+          <Legend wrapperStyle={{ fontSize: 11 }} />
+          <Line yAxisId="rate" dataKey="rate" name={rateLabel} stroke={color} strokeWidth={2} dot={{ r: 3 }} />
+          <Line yAxisId="hazard" dataKey="hazard" name={hazardLabel} stroke="#ef4444" strokeWidth={2} dot={{ r: 3 }} />
+        </LineChart>
+      </ResponsiveContainer>
+    </div>
+  );
+}
@@ -10,14 +10,50 @@ export interface SearchResult {
 
 const API = '/api';
 
+type RosterIndex = Record<string, Record<string, { batters: string[]; bowlers: string[] }>>;
+
+export interface Bootstrap {
+  generation: string;
+  teams: Team[];
+  index: RosterIndex;
+}
+
+// One /bootstrap request per page load, shared by every hook
+let bootstrapPromise: Promise<Bootstrap> | null = null;
+
+export function fetchBootstrap(): Promise<Bootstrap> {
+  if (!bootstrapPromise) {
+    bootstrapPromise = fetch(`${API}/bootstrap`)
+      .then(r => {
+        if (!r.ok) throw new Error('Bootstrap failed');
+        return r.json();
+      })
+      .catch(e => {
+        bootstrapPromise = null;
+        throw e;
+      });
+  }
+  return bootstrapPromise;
+}
+
+// Pin a request to the bootstrapped generation so it can be cached as immutable
+async function pinned(params: URLSearchParams): Promise<URLSearchParams> {
+  try {
+    params.set('v', (await fetchBootstrap()).generation);
+  } catch {
+    // Unpinned requests still work, they are just revalidated more often
+  }
+  return params;
+}
+
 export function useTeams() {
   const [teams, setTeams] = useState<Team[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetch(`${API}/teams`)
-      .then(r => r.json())
+    fetchBootstrap()
       .then(d => setTeams(d.teams))
+      .catch(() => setTeams([]))
       .finally(() => setLoading(false));
   }, []);
 
@@ -31,9 +67,9 @@ export function usePlayers(team: string, format: Format | '', role: Role | '') {
   useEffect(() => {
     if (!team || !format || !role) { setPlayers([]); return; }
     setLoading(true);
-    fetch(`${API}/players?team=${encodeURIComponent(team)}&format=${format}&role=${role}`)
-      .then(r => r.json())
-      .then(d => setPlayers(d.players || []))
+    const roleKey = role === 'batter' ? 'batters' : 'bowlers';
+    fetchBootstrap()
+      .then(d => setPlayers(d.index[team]?.[format]?.[roleKey] || []))
       .catch(() => setPlayers([]))
       .finally(() => setLoading(false));
   }, [team, format, role]);
@@ -55,7 +91,8 @@ export function usePlayerSearch(q: string, format: Format | '', role: Role | '')
       const params = new URLSearchParams({ q });
       if (format) params.set('format', format);
       if (role) params.set('role', role);
-      fetch(`${API}/search?${params}`)
+      pinned(params)
+        .then(p => fetch(`${API}/search?${p}`))
         .then(r => r.json())
         .then(d => setResults(d.results || []))
         .catch(() => setResults([]))
@@ -77,7 +114,8 @@ export function usePlayerData(name: string, format: Format | '', role: Role | ''
     if (!name || !format || !role) { setData(null); return; }
     setLoading(true);
     setError(null);
-    fetch(`${API}/player?name=${encodeURIComponent(name)}&format=${format}&role=${role}`)
+    pinned(new URLSearchParams({ name, format, role }))
+      .then(p => fetch(`${API}/player?${p}`))
       .then(r => {
         if (!r.ok) throw new Error(`Player data not found`);
         return r.json();
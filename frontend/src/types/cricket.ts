@@ -32,6 +32,40 @@ export interface PhaseStats {
   dot_pct?: number;
 }
 
+export interface Percentiles {
+  peers: number;
+  stats: Record<string, number>;
+  phases: Record<string, Record<string, number>>;
+}
+
+// Splits from the player-metadata join; balls is 0 when no metadata matched
+export interface SplitBatting {
+  balls?: number;
+  average: number;
+  strike_rate: number;
+}
+
+export interface SplitBowling {
+  balls?: number;
+  economy: number;
+  wickets: number;
+}
+
+// Fixed-length curves; null where the player has no balls in that bucket.
+// hazard is dismissals (or wickets) per ball, in %.
+export interface Progression {
+  bucket: number;
+  balls: number[];
+  strike_rate: (number | null)[];
+  hazard: (number | null)[];
+}
+
+export interface Spells {
+  balls: number[];
+  economy: (number | null)[];
+  hazard: (number | null)[];
+}
+
 export interface BatterStats {
   runs: number;
   innings: number;
@@ -65,11 +99,13 @@ export interface BatterData {
   stats: BatterStats;
   phases: Record<string, PhaseStats>;
   dismissals_breakdown: Record<string, number>;
+  progression?: Progression;
   wagon_wheel: WagonWheelZone[];
-  vs_pace: { average: number; strike_rate: number };
-  vs_spin: { average: number; strike_rate: number };
-  vs_left_arm: { average: number; strike_rate: number };
-  vs_right_arm: { average: number; strike_rate: number };
+  vs_pace: SplitBatting;
+  vs_spin: SplitBatting;
+  vs_left_arm: SplitBatting;
+  vs_right_arm: SplitBatting;
+  percentiles?: Percentiles;
 }
 
 export interface BowlerData {
@@ -81,9 +117,11 @@ export interface BowlerData {
   stats: BowlerStats;
   phases: Record<string, PhaseStats>;
   wicket_types: Record<string, number>;
+  spells?: Spells;
   pitch_map: PitchMapCell[];
-  vs_rhb: { economy: number; wickets: number };
-  vs_lhb: { economy: number; wickets: number };
+  vs_rhb: SplitBowling;
+  vs_lhb: SplitBowling;
+  percentiles?: Percentiles;
 }
 
 export type PlayerData = BatterData | BowlerData;
@@ -54,3 +54,30 @@ WAGON_WHEEL_ZONES = {
 RAW_DATA_DIR = "../data/raw"
 PROCESSED_DATA_DIR = "../data/processed"
 SAMPLE_DATA_DIR = "../data/processed/sample"
+
+# Memory ceiling (MB) for streaming match files through process_data.py
+MEMORY_BUDGET_MB = 1024
+
+# Versioned output generations: each run writes into its own directory and
+# is published by atomically replacing the CURRENT pointer file.
+GENERATIONS_DIR = "../data/processed/generations"
+CURRENT_POINTER = "../data/processed/CURRENT"
+KEEP_GENERATIONS = 3
+
+# Separate data root for `generate_sample.py --players N` load-test
+# generations, so they never replace or prune the real ones
+SYNTHETIC_DATA_DIR = "../data/synthetic"
+
+# Shared directory for `process_data.py --shard i/n` partial outputs
+SHARD_DATA_DIR = "../data/processed/shards"
+
+# Batting hand and bowling type/arm per player, for the vs pace/spin and
+# handedness splits (see metadata.py for the format)
+PLAYER_METADATA = "../data/raw/player_metadata.csv"
+
+# Match files that fail ingestion checks are moved here
+QUARANTINE_DIR = "../data/quarantine"
+
+# Output stage: writer threads, and outputs encoded/written per thread task
+OUTPUT_WORKERS = 8
+OUTPUT_BATCH = 256
@@ -1,11 +1,24 @@
 """
 Generate realistic sample data for demo players.
 Run this to populate data/processed/sample/ without needing Cricsheet downloads.
+
+With --players N it instead publishes a synthetic generation of N batters
+and N bowlers across every format, for testing the backend at scale.
 """
 import os
 import json
 import random
 import math
+import argparse
+
+import numpy as np
+
+from config import FORMATS, PHASES, SYNTHETIC_DATA_DIR
+from publish import GenerationWriter
+from process_data import (
+    add_percentiles, index_players, write_players, CURVE_BALLS, CURVE_POINTS, SPELL_POINTS,
+)
+from similarity import write_similarity
 
 SAMPLE_DIR = "../data/processed/sample"
 
@@ -430,7 +443,375 @@ def generate_bowler_data(bowler, fmt_key):
     }
 
 
+# Synthetic mode: team pools per format. Franchise leagues also get a large
+# "Unknown" bucket, as real Cricsheet rosters do.
+SYNTHETIC_COUNTRIES = ["India", "Australia", "England", "New Zealand", "Pakistan", "South Africa",
+                       "Sri Lanka", "West Indies", "Bangladesh", "Afghanistan", "Ireland", "Zimbabwe"]
+SYNTHETIC_TEAMS = {
+    "tests": SYNTHETIC_COUNTRIES,
+    "odis": SYNTHETIC_COUNTRIES,
+    "t20is": SYNTHETIC_COUNTRIES,
+    "ipl": ["Chennai Super Kings", "Mumbai Indians", "Royal Challengers Bengaluru", "Kolkata Knight Riders",
+            "Delhi Capitals", "Punjab Kings", "Rajasthan Royals", "Sunrisers Hyderabad", "Unknown"],
+    "bbl": ["Sydney Sixers", "Perth Scorchers", "Brisbane Heat", "Melbourne Stars",
+            "Adelaide Strikers", "Hobart Hurricanes", "Sydney Thunder", "Melbourne Renegades", "Unknown"],
+    "psl": ["Lahore Qalandars", "Karachi Kings", "Islamabad United", "Peshawar Zalmi",
+            "Quetta Gladiators", "Multan Sultans", "Unknown"],
+}
+SYNTHETIC_SURNAMES = [
+    "Sharma", "Smith", "Khan", "Williams", "Patel", "Taylor", "Singh", "Jones", "Ahmed", "Brown",
+    "Perera", "Fernando", "Ali", "Wilson", "Kumar", "Thomas", "Hussain", "Walker", "Das", "Clarke",
+    "Rahman", "Evans", "Reddy", "Roberts", "Iqbal", "Hughes", "Silva", "Harris", "Malik", "Lewis",
+    "Nair", "Young", "Shah", "Hall", "Jayasuriya", "Allen", "Rao", "King", "Mendis", "Wright",
+]
+# Per format: batting average, strike rate; bowling economy
+SYNTHETIC_NORMS = {
+    "tests": (34.0, 52.0, 3.1),
+    "odis": (31.0, 84.0, 5.1),
+    "t20is": (24.0, 128.0, 7.4),
+    "ipl": (25.0, 133.0, 8.2),
+    "bbl": (24.0, 129.0, 7.9),
+    "psl": (24.0, 127.0, 7.9),
+}
+# Dismissal and wicket-type mixes the synthetic totals are split over
+SYNTHETIC_DISMISSALS = {"caught": 0.6, "bowled": 0.17, "lbw": 0.13, "run out": 0.07, "stumped": 0.03}
+SYNTHETIC_WICKETS = {"caught": 0.58, "bowled": 0.2, "lbw": 0.15, "caught & bowled": 0.04, "stumped": 0.03}
+# Chance that a pool player has data in a given format
+SYNTHETIC_PARTICIPATION = 0.6
+# Share of a franchise league's players that land in the "Unknown" team
+SYNTHETIC_UNKNOWN_SHARE = 0.4
+ZONES = ["fine_leg", "square_leg", "midwicket", "mid_on",
+         "straight", "mid_off", "cover", "point", "third_man"]
+LENGTHS = ["full_toss", "yorker", "full", "good", "short_of_good", "short"]
+LINES = ["wide_outside_off", "outside_off", "off_stump", "middle_stump", "leg_stump", "outside_leg"]
+
+
+def synthetic_names(n: int, offset: int = 0) -> list[str]:
+    """Unique, readable names ("A.K. Sharma") for pool indices offset..offset+n."""
+    letters = "ABCDEFGHIJKLMNOPRSTVW"
+    names = []
+    for i in range(offset, offset + n):
+        a, rest = i % len(letters), i // len(letters)
+        b, rest = rest % len(letters), rest // len(letters)
+        surname, gen = SYNTHETIC_SURNAMES[rest % len(SYNTHETIC_SURNAMES)], rest // len(SYNTHETIC_SURNAMES)
+        names.append(f"{letters[a]}.{letters[b]}. {surname}" + (f" {gen + 1}" if gen else ""))
+    return names
+
+
+def synthetic_team_draws(rng, teams, n):
+    """Team index per player; "Unknown" (when present) takes SYNTHETIC_UNKNOWN_SHARE."""
+    weights = np.ones(len(teams))
+    if "Unknown" in teams:
+        named = len(teams) - 1
+        weights[:] = (1 - SYNTHETIC_UNKNOWN_SHARE) / named
+        weights[teams.index("Unknown")] = SYNTHETIC_UNKNOWN_SHARE
+    return rng.choice(len(teams), n, p=weights / weights.sum())
+
+
+def _shares(rng, totals, weights):
+    """Split each row's total into integer counts proportional to `weights`."""
+    return rng.multinomial(totals, weights / weights.sum(axis=1, keepdims=True))
+
+
+def _rates(num, den, scale):
+    """num / den * scale per cell, as payload lists (None where den is 0, as in real curves)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.round(num / den * scale, 2).tolist()
+    return [[r if d else None for r, d in zip(row, drow)] for row, drow in zip(rates, den.tolist())]
+
+
+def _batting_splits(rng, balls, runs, dismissals, share):
+    """
+    Both sides of a split ({balls, average, strike_rate} each): the drawn
+    balls, runs and dismissals are partitioned, so the two sides add up.
+    """
+    n = len(balls)
+    sp_balls = _shares(rng, balls, np.stack([share, 1 - share], axis=1))
+    sp_runs = _shares(rng, runs, sp_balls * rng.uniform(0.85, 1.15, (n, 2)) + 1e-9)
+    sp_dis = _shares(rng, dismissals, sp_balls + 1e-9)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(sp_dis > 0, np.round(sp_runs / sp_dis, 2), sp_runs).tolist()
+        sr = np.where(sp_balls > 0, np.round(sp_runs / sp_balls * 100, 2), 0).tolist()
+    sp_balls = sp_balls.tolist()
+    return [
+        [{"balls": b[j], "average": a[j], "strike_rate": r[j]} for b, a, r in zip(sp_balls, avg, sr)]
+        for j in range(2)
+    ]
+
+
+def _breakdown(rng, totals, mix):
+    """Split each total over the labels in `mix`, ordered like _ranked() (most frequent first, no zeros)."""
+    counts = _shares(rng, totals, np.tile(list(mix.values()), (len(totals), 1))).tolist()
+    labels = list(mix)
+    return [
+        {labels[j]: c for j, c in sorted(enumerate(row), key=lambda jc: -jc[1]) if c}
+        for row in counts
+    ]
+
+
+def synthetic_batters(rng, fmt_key, names, teams, phase_labels):
+    """
+    Vectorized draws for one format's batters; returns payload dicts.
+    Ball, run, boundary, dot and dismissal counts are drawn per phase and
+    per progression bucket, and every rate is derived from them, so the
+    totals add up like a real payload's.
+    """
+    n = len(names)
+    avg0, sr0, _ = SYNTHETIC_NORMS[fmt_key]
+    innings = rng.integers(8, 260, n)
+    dismissals = np.maximum(1, np.round(innings * rng.uniform(0.75, 0.95, n))).astype(int)
+    target_avg = avg0 * rng.lognormal(0, 0.3, n)
+    target_sr = np.clip(rng.normal(sr0, sr0 * 0.12, n), 20, 250)
+    balls = np.maximum(50, np.round(target_avg * dismissals / target_sr * 100)).astype(int)
+    dot_rate = np.clip(rng.normal(60 - sr0 * 0.2, 6, n), 5, 85) / 100
+    team_idx = synthetic_team_draws(rng, teams, n)
+
+    # Phases: balls split by usage, runs at a per-phase strike rate, and
+    # boundaries/dots/dismissals spread in proportion to balls and scoring
+    k = len(phase_labels)
+    ph_balls = _shares(rng, balls, rng.dirichlet(np.full(k, 4.0), n))
+    ph_sr = target_sr[:, None] * rng.normal(1.0, 0.12, (n, k)).clip(0.5, 1.5)
+    ph_runs = np.round(ph_balls * ph_sr / 100).astype(int)
+    runs = ph_runs.sum(axis=1)
+    scoring = ph_runs + 1
+    fours = np.round(runs * rng.uniform(0.35, 0.55, n) / 4).astype(int)
+    sixes = np.round(runs * rng.uniform(0.02, 0.25, n) * sr0 / 130 / 6).astype(int)
+    ph_fours = _shares(rng, fours, scoring)
+    ph_sixes = _shares(rng, sixes, scoring)
+    ph_dots = _shares(rng, np.round(balls * dot_rate).astype(int), ph_balls + 1)
+    ph_dis = _shares(rng, dismissals, ph_balls + 1)
+    dots = ph_dots.sum(axis=1)
+    hundreds = rng.binomial(innings, np.clip(runs / dismissals / 900, 0, 0.2))
+    fifties = rng.binomial(innings, np.clip(runs / dismissals / 250, 0, 0.4))
+
+    # Progression: balls reaching each bucket fall off with innings length,
+    # strike rate climbs as the batter gets in and early buckets are riskier
+    bucket = np.arange(CURVE_POINTS)
+    length = (balls / innings)[:, None]
+    reach = np.exp(-bucket * CURVE_BALLS / length)
+    reach[:, -1] /= 1 - np.exp(-CURVE_BALLS / length[:, 0])  # open-ended last bucket
+    pr_balls = _shares(rng, balls, reach)
+    ramp = pr_balls * (0.75 + 0.5 * (1 - np.exp(-bucket / 3)))
+    pr_runs = np.round(ramp * (runs / ramp.sum(axis=1))[:, None]).astype(int)
+    pr_dis = _shares(rng, dismissals, pr_balls * (1.6 - 0.6 * (1 - np.exp(-bucket / 2))) + 1e-9)
+
+    # Boundaries land in zones first; the other runs follow the same weights
+    wagon_w = rng.dirichlet(np.full(len(ZONES), 6.0), n)
+    wagon_4s = _shares(rng, fours, wagon_w)
+    wagon_6s = _shares(rng, sixes, wagon_w)
+    wagon_runs = 4 * wagon_4s + 6 * wagon_6s + _shares(rng, runs - 4 * fours - 6 * sixes, wagon_w)
+    dismissal_mix = _breakdown(rng, dismissals, SYNTHETIC_DISMISSALS)
+
+    vs_pace, vs_spin = _batting_splits(rng, balls, runs, dismissals, rng.uniform(0.55, 0.8, n))
+    vs_left_arm, vs_right_arm = _batting_splits(rng, balls, runs, dismissals, rng.uniform(0.15, 0.35, n))
+
+    cols = [a.tolist() for a in (innings, dismissals, runs, balls, fours, sixes, dots, hundreds, fifties, team_idx)]
+    phase_cols = [a.tolist() for a in (ph_balls, ph_runs, ph_fours, ph_sixes, ph_dots, ph_dis)]
+    wagon_cols = [a.tolist() for a in (wagon_runs, wagon_4s, wagon_6s)]
+    pr_balls_l = pr_balls.tolist()
+    pr_sr = _rates(pr_runs, pr_balls, 100)
+    pr_hazard = _rates(pr_dis, pr_balls, 100)
+
+    payloads = []
+    for i, name in enumerate(names):
+        inn, dis, r, b, f4, s6, dot, h, fifty, t = (c[i] for c in cols)
+        pb, pr, p4, p6, pdot, pdis = (c[i] for c in phase_cols)
+        zr, z4, z6 = (c[i] for c in wagon_cols)
+        payloads.append({
+            "name": name,
+            "team": teams[t],
+            "country": "",
+            "format": fmt_key,
+            "role": "batter",
+            "stats": {
+                "runs": r, "balls_faced": b, "innings": inn, "dismissals": dis, "not_outs": inn - dis,
+                "average": round(r / dis, 2), "strike_rate": round(r / b * 100, 2),
+                "hundreds": h, "fifties": fifty, "fours": f4, "sixes": s6,
+                "boundary_pct": round((f4 + s6) / b * 100, 2), "dot_pct": round(dot / b * 100, 2),
+            },
+            "phases": {
+                ph: {
+                    "runs": pr[j], "balls": pb[j], "dismissals": pdis[j],
+                    "average": round(pr[j] / pdis[j], 2) if pdis[j] else pr[j],
+                    "strike_rate": round(pr[j] / pb[j] * 100, 2) if pb[j] else 0,
+                    "boundary_pct": round((p4[j] + p6[j]) / pb[j] * 100, 2) if pb[j] else 0,
+                    "dot_pct": round(pdot[j] / pb[j] * 100, 2) if pb[j] else 0,
+                }
+                for j, ph in enumerate(phase_labels)
+            },
+            "dismissals_breakdown": dismissal_mix[i],
+            "progression": {
+                "bucket": CURVE_BALLS, "balls": pr_balls_l[i], "strike_rate": pr_sr[i], "hazard": pr_hazard[i],
+            },
+            "wagon_wheel": [
+                {"zone": z, "runs": zr[j], "fours": z4[j], "sixes": z6[j],
+                 "angle_start": j * 40 - 160, "angle_end": (j + 1) * 40 - 160}
+                for j, z in enumerate(ZONES)
+            ],
+            "vs_pace": vs_pace[i],
+            "vs_spin": vs_spin[i],
+            "vs_left_arm": vs_left_arm[i],
+            "vs_right_arm": vs_right_arm[i],
+        })
+    return payloads
+
+
+def _bowling_splits(rng, legal, runs, wickets, share):
+    """
+    Both batting hands ({balls, economy, wickets} each): the drawn balls,
+    runs and wickets are partitioned, so the two sides add up.
+    """
+    n = len(legal)
+    sp_balls = _shares(rng, legal, np.stack([share, 1 - share], axis=1))
+    sp_runs = _shares(rng, runs, sp_balls * rng.uniform(0.9, 1.1, (n, 2)) + 1e-9)
+    sp_wkts = _shares(rng, wickets, sp_balls + 1e-9)
+    sp_overs = np.round(sp_balls / 6, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eco = np.where(sp_overs > 0, np.round(sp_runs / sp_overs, 2), 0).tolist()
+    sp_balls, sp_wkts = sp_balls.tolist(), sp_wkts.tolist()
+    return [
+        [{"balls": b[j], "economy": e[j], "wickets": w[j]} for b, e, w in zip(sp_balls, eco, sp_wkts)]
+        for j in range(2)
+    ]
+
+
+def synthetic_bowlers(rng, fmt_key, names, teams, phase_labels):
+    """
+    Vectorized draws for one format's bowlers; returns payload dicts.
+    Balls, runs and wickets are drawn per phase and per over of the spell,
+    and economies and averages are derived from them.
+    """
+    n = len(names)
+    _, _, eco0 = SYNTHETIC_NORMS[fmt_key]
+    legal = rng.integers(30, 12000 if fmt_key == "tests" else 4000, n)
+    target_eco = np.clip(rng.normal(eco0, eco0 * 0.12, n), 1.5, 14)
+    sr_target = rng.normal(55 if fmt_key == "tests" else 26, 6, n).clip(10, 120)
+    wickets = rng.poisson(legal / sr_target)
+
+    k = len(phase_labels)
+    ph_share = rng.dirichlet(np.full(k, 4.0), n)
+    ph_balls = _shares(rng, legal, ph_share)
+    ph_runs = np.round(ph_balls / 6 * target_eco[:, None] * rng.normal(1.0, 0.12, (n, k)).clip(0.5, 1.5)).astype(int)
+    ph_wkts = _shares(rng, wickets, ph_share)
+    runs = ph_runs.sum(axis=1)
+    overs = np.round(legal / 6, 1)
+    economy = np.round(runs / overs, 2)
+
+    # Spells: fewer balls reach later overs of a spell, and economy creeps up
+    position = np.arange(SPELL_POINTS)
+    length = rng.uniform(1.5, 4.0, n)[:, None]
+    reach = np.exp(-position / length)
+    reach[:, -1] /= 1 - np.exp(-1 / length[:, 0])  # open-ended last over
+    sp_balls = _shares(rng, legal, reach)
+    drift = 1 + 0.03 * position
+    sp_runs = np.round(sp_balls / 6 * economy[:, None] * drift * rng.normal(1.0, 0.08, (n, SPELL_POINTS)).clip(0.7, 1.3)).astype(int)
+    sp_wkts = _shares(rng, wickets, sp_balls + 1e-9)
+
+    cells = len(LENGTHS) * len(LINES)
+    cell_w = rng.dirichlet(np.full(cells, 1.5), n)
+    cell_balls = np.maximum(1, np.round(cell_w * legal[:, None])).astype(int)
+    cell_wkts = rng.binomial(cell_balls, np.clip(wickets / np.maximum(legal, 1), 0, 1)[:, None])
+    cell_eco = np.round(np.clip(economy[:, None] * rng.normal(1.0, 0.2, (n, cells)), 1, 20), 2)
+    team_idx = synthetic_team_draws(rng, teams, n)
+    vs_rhb, vs_lhb = _bowling_splits(rng, legal, runs, wickets, rng.uniform(0.6, 0.8, n))
+    wicket_mix = _breakdown(rng, wickets, SYNTHETIC_WICKETS)
+
+    cols = [a.tolist() for a in (legal, economy, runs, wickets, overs, team_idx)]
+    phase_cols = [a.tolist() for a in (ph_balls, ph_runs, ph_wkts)]
+    cell_cols = [a.tolist() for a in (cell_balls, cell_wkts, cell_eco)]
+    sp_balls_l = sp_balls.tolist()
+    sp_eco = _rates(sp_runs, sp_balls, 6)
+    sp_hazard = _rates(sp_wkts, sp_balls, 100)
+
+    payloads = []
+    for i, name in enumerate(names):
+        lb, eco, r, w, ov, t = (c[i] for c in cols)
+        pb, pr, pw = (c[i] for c in phase_cols)
+        cb, cw, ce = (c[i] for c in cell_cols)
+        phases = {}
+        for j, ph in enumerate(phase_labels):
+            ph_overs = round(pb[j] / 6, 1)
+            phases[ph] = {
+                "overs": ph_overs, "runs": pr[j], "wickets": pw[j],
+                "economy": round(pr[j] / ph_overs, 2) if ph_overs else 0,
+                "average": round(pr[j] / pw[j], 2) if pw[j] else None,
+            }
+        payloads.append({
+            "name": name,
+            "team": teams[t],
+            "country": "",
+            "format": fmt_key,
+            "role": "bowler",
+            "stats": {
+                "overs": ov, "wickets": w, "runs_conceded": r, "economy": eco,
+                "average": round(r / w, 2) if w else None,
+                "strike_rate": round(lb / w, 2) if w else None,
+            },
+            "phases": phases,
+            "wicket_types": wicket_mix[i],
+            "spells": {"balls": sp_balls_l[i], "economy": sp_eco[i], "hazard": sp_hazard[i]},
+            "pitch_map": [
+                {"length": length, "line": line, "balls": cb[c], "wickets": cw[c], "economy": ce[c]}
+                for c, (length, line) in enumerate((l, ln) for l in LENGTHS for ln in LINES)
+            ],
+            "vs_rhb": vs_rhb[i],
+            "vs_lhb": vs_lhb[i],
+        })
+    return payloads
+
+
+def generate_synthetic(players: int, seed: int, out_dir: str = SYNTHETIC_DATA_DIR) -> None:
+    """
+    Publish a generation of `players` synthetic batters and as many
+    bowlers, spread over every format in FORMATS, for load-testing the
+    backend at production cardinality. Each (format, role) draws from its
+    own seeded generator, so output is reproducible for a given seed.
+    Generations go under `out_dir`, with their own CURRENT pointer, so they
+    never replace or prune the real ones.
+    """
+    writer = GenerationWriter(os.path.join(out_dir, "generations"), os.path.join(out_dir, "CURRENT"))
+    players_index: dict = {}
+    batter_pool = synthetic_names(players)
+    bowler_pool = synthetic_names(players, offset=players)
+
+    for f, fmt_key in enumerate(FORMATS):
+        teams = SYNTHETIC_TEAMS[fmt_key]
+        phase_labels = list(PHASES.get(fmt_key, PHASES["t20is"]))
+        for r, (role, pool, build) in enumerate((
+            ("batter", batter_pool, synthetic_batters),
+            ("bowler", bowler_pool, synthetic_bowlers),
+        )):
+            rng = np.random.default_rng([seed, f, r])
+            names = [n for n, keep in zip(pool, rng.random(len(pool)) < SYNTHETIC_PARTICIPATION) if keep]
+            payloads = build(rng, fmt_key, names, teams, phase_labels)
+            add_percentiles(payloads, role)
+            write_similarity(writer, fmt_key, role, payloads)
+
+            write_players(writer, fmt_key, role, payloads)
+            index_players(players_index, fmt_key, role, payloads)
+            print(f"[{fmt_key}] {len(payloads)} synthetic {role}s")
+
+    writer.write("index", players_index)
+    writer.publish()
+    print(f"Published synthetic generation {writer.generation}: {len(writer.hashes)} outputs")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Generate demo or synthetic processed data.")
+    parser.add_argument(
+        "--players", type=int, default=0,
+        help="Publish a synthetic generation with this many batters and bowlers instead of the demo sample",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Seed for synthetic draws (default 42)")
+    parser.add_argument(
+        "--out-dir", default=SYNTHETIC_DATA_DIR,
+        help=f"Data root for the synthetic generations and their CURRENT pointer (default {SYNTHETIC_DATA_DIR})",
+    )
+    args = parser.parse_args()
+    if args.players:
+        generate_synthetic(args.players, args.seed, args.out_dir)
+        return
+
     random.seed(42)
     os.makedirs(SAMPLE_DIR, exist_ok=True)
 
@@ -0,0 +1,92 @@
+"""
+Ingestion checks applied to every match file before it is aggregated.
+
+Each parsed file is fingerprinted by its match_id plus a hash of its
+parsed delivery columns, so formatting-only differences do not matter.
+Exact duplicates (a match re-issued under a new filename) are dropped.
+A match_id seen again with different content is flagged as a conflict,
+and only the first version is kept. Files that fail to parse, lack
+required columns or do not hold exactly one match are moved to the
+quarantine directory (or, without one, only reported). Which version of a
+conflicting match is kept follows the order files are admitted in, so
+callers pass them sorted.
+"""
+import os
+import shutil
+import hashlib
+from typing import Any, Optional
+
+import pandas as pd
+
+
+class IngestReport:
+    """Admits or rejects one format's match files and tallies what was dropped."""
+
+    def __init__(self, fmt: str, required: list[str], quarantine_dir: Optional[str] = None):
+        self.fmt = fmt
+        self.required = required
+        self.quarantine_dir = quarantine_dir
+        self.files = 0
+        self.rows = 0
+        self.rows_skipped = 0
+        # match_id -> (content hash, file) of the version that was kept
+        self.seen: dict[str, tuple[str, str]] = {}
+        self.duplicates: list[dict[str, Any]] = []
+        self.conflicts: list[dict[str, Any]] = []
+        self.quarantined: list[dict[str, str]] = []
+
+    def quarantine(self, path: str, reason: str) -> None:
+        """Move an unusable file aside so later runs skip it too."""
+        name = os.path.basename(path)
+        if self.quarantine_dir:
+            dest_dir = os.path.join(self.quarantine_dir, self.fmt)
+            os.makedirs(dest_dir, exist_ok=True)
+            try:
+                shutil.move(path, os.path.join(dest_dir, name))
+            except OSError:
+                pass  # already moved, e.g. by a concurrent shard
+        self.quarantined.append({"file": name, "reason": reason})
+
+    def admit(self, path: str, df: pd.DataFrame) -> bool:
+        """Record a parsed file; False if its rows must not be aggregated."""
+        missing = [c for c in self.required if c not in df]
+        if missing:
+            self.quarantine(path, f"missing columns: {', '.join(missing)}")
+            return False
+        match_ids = df["match_id"].dropna().unique()
+        if len(match_ids) != 1:
+            self.quarantine(path, f"expected one match_id, found {len(match_ids)}")
+            return False
+
+        self.files += 1
+        name = os.path.basename(path)
+        match_id = str(match_ids[0])
+        digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+        if match_id not in self.seen:
+            self.seen[match_id] = (digest, name)
+            self.rows += len(df)
+            return True
+
+        kept_digest, kept = self.seen[match_id]
+        entry = {"file": name, "match_id": match_id, "kept": kept, "rows": len(df)}
+        (self.duplicates if digest == kept_digest else self.conflicts).append(entry)
+        self.rows_skipped += len(df)
+        return False
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "files": self.files,
+            "matches": len(self.seen),
+            "rows": self.rows,
+            "rows_skipped": self.rows_skipped,
+            "duplicates": self.duplicates,
+            "conflicts": self.conflicts,
+            "quarantined": self.quarantined,
+        }
+
+    def describe(self) -> str:
+        return (
+            f"[{self.fmt}] Ingested {len(self.seen)} matches ({self.rows} rows); "
+            f"dropped {len(self.duplicates)} duplicate and {len(self.conflicts)} conflicting files "
+            f"({self.rows_skipped} rows saved); quarantined {len(self.quarantined)}"
+        )
@@ -0,0 +1,99 @@
+"""
+Player metadata join for the vs pace/spin and handedness splits.
+
+A local CSV (PLAYER_METADATA in config.py) gives each player's batting
+hand, bowling type and bowling arm, keyed by Cricsheet registry
+identifier and/or the name used in the match files:
+
+  identifier,name,batting_hand,bowling_type,bowling_arm
+  ba607b88,V Kohli,right,pace,right
+
+Identifiers are resolved to match-file names through the registry lines
+of the *_info.csv files. Attributes are integer-coded (-1 unknown), so
+joining them onto a chunk of deliveries is one map per derived column.
+"""
+import os
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN = -1
+
+# Attribute -> code vocabulary (code = position)
+ATTRIBUTES = {
+    "batting_hand": ["right", "left"],
+    "bowling_type": ["pace", "spin"],
+    "bowling_arm": ["right", "left"],
+}
+
+# Derived delivery column -> (player column it is joined on, attribute)
+JOINS = {
+    "striker_hand": ("striker", "batting_hand"),
+    "bowler_type": ("bowler", "bowling_type"),
+    "bowler_arm": ("bowler", "bowling_arm"),
+}
+
+REGISTRY_PREFIX = "info,registry,people,"
+
+
+def code(attribute: str, label: str) -> int:
+    return ATTRIBUTES[attribute].index(label)
+
+
+def read_registry(info_paths: Iterable[str]) -> dict[str, str]:
+    """Cricsheet registry identifier -> match-file name, from *_info.csv files."""
+    registry = {}
+    for path in info_paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(REGISTRY_PREFIX):
+                    name, identifier = line[len(REGISTRY_PREFIX):].rstrip("\r\n").rsplit(",", 1)
+                    registry[identifier.strip()] = name.strip().strip('"')
+    return registry
+
+
+class PlayerMetadata:
+    """Integer-coded player attributes, indexed by match-file name."""
+
+    def __init__(self, codes: pd.DataFrame | None = None):
+        if codes is None:
+            codes = pd.DataFrame({attr: pd.Series(dtype="int8") for attr in ATTRIBUTES})
+        self.codes = codes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def join(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add the JOINS columns to a chunk of deliveries (UNKNOWN where unlisted)."""
+        for col, (player_col, attr) in JOINS.items():
+            df[col] = df[player_col].map(self.codes[attr]).fillna(UNKNOWN).astype(np.int8)
+        return df
+
+
+def load_player_metadata(path: str, info_paths: Iterable[str] = ()) -> PlayerMetadata:
+    """
+    Read and encode the metadata table. Rows keyed only by identifier are
+    resolved through the registry in `info_paths`, which is scanned only
+    if such rows exist. Unrecognised attribute values are coded UNKNOWN.
+    """
+    if not os.path.exists(path):
+        print(f"No player metadata at {path} — vs pace/spin and handedness splits will be empty")
+        return PlayerMetadata()
+
+    table = pd.read_csv(path, dtype=str)
+    names = table["name"] if "name" in table else pd.Series(np.nan, index=table.index, dtype=object)
+    if "identifier" in table:
+        unresolved = names.isna() & table["identifier"].notna()
+        if unresolved.any():
+            registry = read_registry(info_paths)
+            names = names.fillna(table["identifier"].map(registry))
+    table = table.assign(name=names.str.strip()).dropna(subset=["name"]).drop_duplicates("name")
+
+    codes = pd.DataFrame(index=pd.Index(table["name"], name="player"))
+    for attr, labels in ATTRIBUTES.items():
+        values = table[attr].str.strip().str.lower() if attr in table else pd.Series(np.nan, index=table.index)
+        mapped = values.map({label: i for i, label in enumerate(labels)}).fillna(UNKNOWN)
+        codes[attr] = mapped.to_numpy(dtype=np.int8)
+    print(f"Loaded metadata for {len(codes)} players")
+    return PlayerMetadata(codes)
@@ -11,14 +11,73 @@ Cricsheet CSV2 columns (key ones):
 import os
 import json
 import math
-import random
+import hashlib
+import shutil
+import argparse
 from collections import defaultdict
-from typing import Any
+from typing import Any, Iterator, Optional
 
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-from config import FORMATS, PHASES, RAW_DATA_DIR, PROCESSED_DATA_DIR
+from config import (
+    FORMATS, PHASES, RAW_DATA_DIR, MEMORY_BUDGET_MB, SHARD_DATA_DIR, PLAYER_METADATA, QUARANTINE_DIR,
+)
+from publish import GenerationWriter, dumps
+from store import DeliveryStoreWriter, DeliveryStoreReader, STORE_DIR, META_FILE
+from similarity import write_similarity
+from ingest import IngestReport
+from metadata import PlayerMetadata, load_player_metadata, code
+from simulate import (
+    stable_seed, player_seeds,
+    compute_wagon_wheels, wagon_wheel_records, compute_pitch_maps, pitch_map_records,
+)
+
+# Only these columns are parsed from each match file
+DELIVERY_COLUMNS = [
+    "match_id", "start_date", "venue", "innings", "ball",
+    "batting_team", "bowling_team", "striker", "non_striker", "bowler",
+    "runs_off_bat", "extras", "wides", "wicket_type", "player_dismissed",
+]
+# Dismissals not credited to the bowler (the phase split has always used the shorter list)
+BOWLER_EXCLUDED = ["run out", "retired hurt", "obstructing the field"]
+PHASE_EXCLUDED = ["run out", "retired hurt"]
+
+# Marker written by a shard once all its partial outputs are complete
+SHARD_DONE = "DONE"
+# Output key of the per-format duplicate/conflict/quarantine report
+INGEST_REPORT = "ingest_report"
+
+# Qualification thresholds for writing a player file
+MIN_BALLS_FACED = 50
+MIN_OVERS_BOWLED = 5
+
+# Progression curves: balls-faced buckets of CURVE_BALLS (the last one
+# open-ended) and overs into a spell, where a gap of more than SPELL_BREAK
+# overs in the innings starts a new spell
+CURVE_BALLS = 10
+CURVE_POINTS = 12
+SPELL_POINTS = 8
+SPELL_BREAK = 2
+
+# Metadata codes behind the vs_* splits
+PACE, SPIN = code("bowling_type", "pace"), code("bowling_type", "spin")
+RIGHT_ARM, LEFT_ARM = code("bowling_arm", "right"), code("bowling_arm", "left")
+RIGHT_HAND, LEFT_HAND = code("batting_hand", "right"), code("batting_hand", "left")
+
+# Stats ranked against qualified peers of the same format and role
+PERCENTILE_STATS = {
+    "batter": {
+        "stats": ["runs", "average", "strike_rate", "boundary_pct", "dot_pct"],
+        "phases": ["average", "strike_rate", "boundary_pct", "dot_pct"],
+    },
+    "bowler": {
+        "stats": ["wickets", "economy", "average", "strike_rate"],
+        "phases": ["wickets", "economy", "average"],
+    },
+}
+# Ranked in reverse so a higher percentile always means "better than more peers"
+LOWER_IS_BETTER = {"batter": {"dot_pct"}, "bowler": {"economy", "average", "strike_rate"}}
 
 
 def over_to_phase(over_num: int, fmt: str) -> str:
@@ -29,285 +88,899 @@ def over_to_phase(over_num: int, fmt: str) -> str:
     return list(phases.keys())[-1]
 
 
-def compute_wagon_wheel(df_batter: pd.DataFrame) -> list[dict]:
+def read_match_file(path: str) -> pd.DataFrame:
+    """Parse one match CSV, keeping only the columns the aggregates use."""
+    return pd.read_csv(path, usecols=lambda c: c in DELIVERY_COLUMNS, low_memory=False)
+
+
+def iter_chunks(
+    csv_paths: list[str], budget_mb: int, desc: str = "", report: Optional[IngestReport] = None,
+) -> Iterator[pd.DataFrame]:
     """
-    Estimate scoring zones from ball data.
-    Cricsheet doesn't include wagon wheel coords — we simulate zones
-    based on known batting patterns (shot type isn't in the data either).
-    A real implementation would need ESPNcricinfo shot data.
-    We distribute runs across 8 zones using weighted randomness seeded
-    by the player name for reproducibility.
+    Yield match files concatenated into bounded chunks.
+    Parsed frames are buffered until they reach a third of the memory
+    budget; the concat copy and the derived columns take the rest.
+    With a `report`, duplicate and conflicting match files are dropped and
+    unparseable ones quarantined before they reach a chunk; otherwise
+    unparseable files are just skipped.
     """
-    zones = ["fine_leg", "square_leg", "midwicket", "mid_on",
-             "straight", "mid_off", "cover", "point", "third_man"]
-    total_runs = int(df_batter["runs_off_bat"].sum())
-    boundaries_4 = int((df_batter["runs_off_bat"] == 4).sum())
-    boundaries_6 = int((df_batter["runs_off_bat"] == 6).sum())
-
-    # Weighted distribution — more realistic than uniform
-    weights = [0.08, 0.12, 0.15, 0.10, 0.07, 0.10, 0.18, 0.12, 0.08]
-    zone_runs = np.random.multinomial(total_runs, weights).tolist()
-    zone_4s = np.random.multinomial(boundaries_4, weights).tolist()
-    zone_6s = np.random.multinomial(boundaries_6, weights).tolist()
-
-    return [
-        {
-            "zone": z,
-            "runs": int(zone_runs[i]),
-            "fours": int(zone_4s[i]),
-            "sixes": int(zone_6s[i]),
-            "angle_start": i * 40 - 160,
-            "angle_end": (i + 1) * 40 - 160,
-        }
-        for i, z in enumerate(zones)
-    ]
+    limit = budget_mb * 1024 * 1024 // 3
+    pending: list[pd.DataFrame] = []
+    pending_bytes = 0
+    for path in tqdm(csv_paths, desc=desc):
+        try:
+            df = read_match_file(path)
+        except Exception as e:
+            if report is not None:
+                report.quarantine(path, f"parse error: {e}")
+            continue
+        if report is not None and not report.admit(path, df):
+            continue
+        pending.append(df)
+        pending_bytes += int(df.memory_usage(deep=True).sum())
+        if pending_bytes >= limit:
+            yield pd.concat(pending, ignore_index=True)
+            pending, pending_bytes = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
 
 
-def compute_pitch_map(df_bowler: pd.DataFrame) -> list[dict]:
+def prepare_deliveries(df: pd.DataFrame, fmt: str, meta: Optional[PlayerMetadata] = None) -> pd.DataFrame:
     """
-    Simulate line & length heatmap for bowlers.
-    Cricsheet doesn't include pitch coords — we approximate.
+    Add the derived per-ball columns shared by the batting and bowling
+    folds, including the integer-coded striker hand and bowler type/arm
+    joined from `meta`.
     """
-    lengths = ["full_toss", "yorker", "full", "good", "short_of_good", "short"]
-    lines = ["wide_outside_off", "outside_off", "off_stump",
-             "middle_stump", "leg_stump", "outside_leg"]
-
-    wickets = int(df_bowler["wicket_type"].notna().sum())
-    balls = len(df_bowler)
-
-    cells = []
-    for length in lengths:
-        for line in lines:
-            freq = random.random() ** 0.5  # skewed toward higher frequency
-            cell_balls = max(1, int(freq * balls / (len(lengths) * len(lines))))
-            cell_wickets = int(freq * wickets / (len(lengths) * len(lines)))
-            cells.append({
-                "length": length,
-                "line": line,
-                "balls": cell_balls,
-                "wickets": cell_wickets,
-                "economy": round(random.uniform(4.5, 9.0), 2),
-            })
-    return cells
-
-
-def process_batter(name: str, fmt: str, df: pd.DataFrame) -> dict[str, Any]:
-    df_b = df[df["striker"] == name].copy()
-    if df_b.empty:
+    over = df["ball"].astype(str).str.split(".").str[0].astype(int) + 1
+    phase_of = {o: over_to_phase(o, fmt) for o in over.unique()}
+    df["over"] = over
+    df["phase"] = over.map(phase_of)
+    df["legal"] = (df["wides"].isna() | (df["wides"] == 0)).astype(int)
+    df["extras"] = df["extras"].fillna(0)
+    return (meta or PlayerMetadata()).join(df)
+
+
+def _fold(acc: dict, key: str, part: pd.Series | pd.DataFrame) -> None:
+    """Sum a chunk's partial aggregate into acc[key], keeping first-seen key order."""
+    if part.empty:
+        return
+    if key in acc:
+        levels = list(range(part.index.nlevels))
+        part = pd.concat([acc[key], part]).groupby(level=levels, sort=False).sum()
+    acc[key] = part
+
+
+def _split(acc: dict, key: str) -> dict[str, pd.Series | pd.DataFrame]:
+    """Split a (player, ...) aggregate into one slice per player."""
+    if key not in acc:
+        return {}
+    return {name: grp.droplevel(0) for name, grp in acc[key].groupby(level=0, sort=False)}
+
+
+def _mode(counts: pd.Series | None) -> str:
+    """Most frequent label, ties broken alphabetically like Series.mode()."""
+    if counts is None or counts.empty:
+        return "Unknown"
+    return str(counts[counts == counts.max()].index.min())
+
+
+def _ranked(counts: pd.Series | None) -> dict[str, int]:
+    """Counts ordered like value_counts(): descending, ties in first-seen order."""
+    if counts is None:
         return {}
-    team = str(df_b["batting_team"].mode()[0]) if "batting_team" in df_b.columns and not df_b.empty else "Unknown"
-
-    df_b["over"] = df_b["ball"].apply(lambda x: int(str(x).split(".")[0]) + 1)
-    df_b["phase"] = df_b["over"].apply(lambda o: over_to_phase(o, fmt))
-    df_b["is_boundary_4"] = df_b["runs_off_bat"] == 4
-    df_b["is_boundary_6"] = df_b["runs_off_bat"] == 6
-    df_b["is_dot"] = df_b["runs_off_bat"] == 0
-
-    balls_faced = len(df_b[df_b["wides"].isna() | (df_b["wides"] == 0)])
-    runs = int(df_b["runs_off_bat"].sum())
-    innings_with_dismissal = df_b[df_b["player_dismissed"] == name]
-    dismissals = len(innings_with_dismissal)
-    average = round(runs / dismissals, 2) if dismissals > 0 else runs
-    strike_rate = round(runs / balls_faced * 100, 2) if balls_faced > 0 else 0
-
-    # Phase breakdown
-    phases_data = {}
-    for phase in df_b["phase"].unique():
-        ph_df = df_b[df_b["phase"] == phase]
-        ph_balls = len(ph_df[ph_df["wides"].isna() | (ph_df["wides"] == 0)])
-        ph_runs = int(ph_df["runs_off_bat"].sum())
-        ph_dismissals = len(ph_df[ph_df["player_dismissed"] == name])
-        phases_data[phase] = {
-            "runs": ph_runs,
-            "balls": ph_balls,
-            "dismissals": ph_dismissals,
-            "average": round(ph_runs / ph_dismissals, 2) if ph_dismissals else ph_runs,
-            "strike_rate": round(ph_runs / ph_balls * 100, 2) if ph_balls else 0,
-            "boundary_pct": round(
-                (ph_df["is_boundary_4"] | ph_df["is_boundary_6"]).sum() / ph_balls * 100, 2
-            ) if ph_balls else 0,
-            "dot_pct": round(ph_df["is_dot"].sum() / ph_balls * 100, 2) if ph_balls else 0,
-        }
-
-    # Dismissal types
-    dismissal_counts = (
-        innings_with_dismissal["wicket_type"]
-        .value_counts()
-        .to_dict()
+    return {str(k): int(v) for k, v in counts.sort_values(ascending=False, kind="stable").items()}
+
+
+def fold_batting(acc: dict, df: pd.DataFrame) -> None:
+    """Fold one chunk of prepared deliveries into the running batting aggregates."""
+    runs = df["runs_off_bat"]
+    dismissed = df["player_dismissed"] == df["striker"]
+    per_ball = pd.DataFrame({
+        "striker": df["striker"],
+        "phase": df["phase"],
+        "balls": df["legal"],
+        "runs": runs,
+        "fours": (runs == 4).astype(int),
+        "sixes": (runs == 6).astype(int),
+        "dots": (runs == 0).astype(int),
+        "dismissals": dismissed.astype(int),
+    })
+    _fold(acc, "phases", per_ball.groupby(["striker", "phase"], sort=False).sum())
+    _fold(acc, "teams", df.groupby(["striker", "batting_team"], sort=False).size())
+    _fold(acc, "dismissals", df[dismissed].groupby(["striker", "wicket_type"], sort=False).size())
+    vs = per_ball[["balls", "runs", "dismissals"]]
+    _fold(acc, "vs_type", vs.groupby([df["striker"], df["bowler_type"]], sort=False).sum())
+    _fold(acc, "vs_arm", vs.groupby([df["striker"], df["bowler_arm"]], sort=False).sum())
+    # Balls faced so far in the innings, including this one (a wide counts
+    # with the next ball). Chunks hold whole match files, so no innings is
+    # split across two folds.
+    faced = df["legal"].groupby([df["match_id"], df["innings"], df["striker"]], sort=False).cumsum()
+    point = ((faced.clip(lower=1) - 1) // CURVE_BALLS).clip(upper=CURVE_POINTS - 1).rename("point")
+    _fold(acc, "curve", vs.groupby([df["striker"], point], sort=False).sum())
+    # Hundreds/fifties are bucketed by global row number, so chunks must
+    # carry their offset in the index.
+    _fold(acc, "buckets", runs.groupby([df["striker"], df.index // 200], sort=False).sum())
+
+
+def fold_bowling(acc: dict, df: pd.DataFrame) -> None:
+    """Fold one chunk of prepared deliveries into the running bowling aggregates."""
+    wt = df["wicket_type"]
+    per_ball = pd.DataFrame({
+        "bowler": df["bowler"],
+        "phase": df["phase"],
+        "legal": df["legal"],
+        "runs": df["runs_off_bat"] + df["extras"],
+        "deliveries": 1,
+        "dismissals": wt.notna().astype(int),
+        "wickets": (wt.notna() & ~wt.isin(BOWLER_EXCLUDED)).astype(int),
+        "phase_wickets": (wt.notna() & ~wt.isin(PHASE_EXCLUDED)).astype(int),
+    })
+    _fold(acc, "phases", per_ball.groupby(["bowler", "phase"], sort=False).sum())
+    _fold(acc, "teams", df.groupby(["bowler", "bowling_team"], sort=False).size())
+    _fold(acc, "wicket_types", df[wt.notna()].groupby(["bowler", "wicket_type"], sort=False).size())
+    vs = per_ball[["legal", "runs", "wickets"]]
+    _fold(acc, "vs_hand", vs.groupby([df["bowler"], df["striker_hand"]], sort=False).sum())
+    # Position of each over within the bowler's spell
+    spell_keys = ["match_id", "innings", "bowler"]
+    overs = df[spell_keys + ["over"]].drop_duplicates()
+    by_bowler = [overs[k] for k in spell_keys]
+    gap = overs.groupby(by_bowler, sort=False)["over"].diff()
+    # Spells are numbered within each bowler's innings, so the overs of
+    # whoever bowls from the other end never land in them
+    spell = (gap.isna() | (gap > SPELL_BREAK)).groupby(by_bowler, sort=False).cumsum().rename("spell")
+    overs["point"] = overs.groupby(by_bowler + [spell], sort=False).cumcount().clip(upper=SPELL_POINTS - 1)
+    point = df[spell_keys + ["over"]].merge(overs, how="left")["point"].to_numpy()
+    _fold(acc, "spell", vs.groupby([df["bowler"], pd.Series(point, index=df.index, name="point")], sort=False).sum())
+
+
+def _batting_split(rows: pd.DataFrame | None, code: int) -> dict[str, Any]:
+    """Average and strike rate against one bowler type/arm code."""
+    if rows is None or code not in rows.index:
+        return {"balls": 0, "average": 0, "strike_rate": 0}
+    balls, runs, dismissals = (int(rows.at[code, c]) for c in ("balls", "runs", "dismissals"))
+    return {
+        "balls": balls,
+        "average": round(runs / dismissals, 2) if dismissals else runs,
+        "strike_rate": round(runs / balls * 100, 2) if balls else 0,
+    }
+
+
+def _bowling_split(rows: pd.DataFrame | None, code: int) -> dict[str, Any]:
+    """Economy and wickets against one batting hand code."""
+    if rows is None or code not in rows.index:
+        return {"balls": 0, "economy": 0, "wickets": 0}
+    balls, runs, wickets = (int(rows.at[code, c]) for c in ("legal", "runs", "wickets"))
+    overs = round(balls / 6, 1)
+    return {"balls": balls, "economy": round(runs / overs, 2) if overs else 0, "wickets": wickets}
+
+
+def _curve_rows(rows: pd.DataFrame | None, points: int, columns: list[str]) -> pd.DataFrame:
+    """A player's curve aggregates at every point 0..points-1 (zeros where empty)."""
+    if rows is None:
+        return pd.DataFrame(0, index=range(points), columns=columns)
+    return rows.reindex(range(points), fill_value=0)
+
+
+def _progression(rows: pd.DataFrame | None) -> dict[str, Any]:
+    """Strike rate and dismissal hazard (% per ball) by balls faced in the innings."""
+    rows = _curve_rows(rows, CURVE_POINTS, ["balls", "runs", "dismissals"])
+    balls = rows["balls"].astype(int).tolist()
+    return {
+        "bucket": CURVE_BALLS,
+        "balls": balls,
+        "strike_rate": [round(r / b * 100, 2) if b else None for r, b in zip(rows["runs"], balls)],
+        "hazard": [round(d / b * 100, 2) if b else None for d, b in zip(rows["dismissals"], balls)],
+    }
+
+
+def _spells(rows: pd.DataFrame | None) -> dict[str, Any]:
+    """Economy and wicket hazard (% per ball) by over of the spell."""
+    rows = _curve_rows(rows, SPELL_POINTS, ["legal", "runs", "wickets"])
+    balls = rows["legal"].astype(int).tolist()
+    return {
+        "balls": balls,
+        "economy": [round(r / (b / 6), 2) if b else None for r, b in zip(rows["runs"], balls)],
+        "hazard": [round(w / b * 100, 2) if b else None for w, b in zip(rows["wickets"], balls)],
+    }
+
+
+def finalize_batting(acc: dict, fmt: str) -> list[dict[str, Any]]:
+    """
+    Turn folded batting aggregates into one payload per batter. The
+    simulated fields are generated for the whole format in one batch.
+    """
+    payloads = []
+    teams = _split(acc, "teams")
+    dismissals_by = _split(acc, "dismissals")
+    buckets = _split(acc, "buckets")
+    vs_type = _split(acc, "vs_type")
+    vs_arm = _split(acc, "vs_arm")
+    curves = _split(acc, "curve")
+
+    for name, ph_rows in _split(acc, "phases").items():
+        totals = ph_rows.sum()
+        balls_faced = int(totals["balls"])
+        runs = int(totals["runs"])
+        fours = int(totals["fours"])
+        sixes = int(totals["sixes"])
+        dismissals = int(totals["dismissals"])
+        average = round(runs / dismissals, 2) if dismissals > 0 else runs
+        strike_rate = round(runs / balls_faced * 100, 2) if balls_faced > 0 else 0
+
+        # Phase breakdown
+        phases_data = {}
+        for phase, ph in ph_rows.iterrows():
+            ph_balls = int(ph["balls"])
+            ph_runs = int(ph["runs"])
+            ph_dismissals = int(ph["dismissals"])
+            phases_data[phase] = {
+                "runs": ph_runs,
+                "balls": ph_balls,
+                "dismissals": ph_dismissals,
+                "average": round(ph_runs / ph_dismissals, 2) if ph_dismissals else ph_runs,
+                "strike_rate": round(ph_runs / ph_balls * 100, 2) if ph_balls else 0,
+                "boundary_pct": round((ph["fours"] + ph["sixes"]) / ph_balls * 100, 2) if ph_balls else 0,
+                "dot_pct": round(ph["dots"] / ph_balls * 100, 2) if ph_balls else 0,
+            }
+
+        bucket_runs = buckets.get(name, pd.Series(dtype=int))
+        payloads.append({
+            "name": name,
+            "team": _mode(teams.get(name)),
+            "country": "",
+            "format": fmt,
+            "role": "batter",
+            "stats": {
+                "runs": runs,
+                "balls_faced": balls_faced,
+                "innings": dismissals + (1 if runs > 0 else 0),
+                "dismissals": dismissals,
+                "not_outs": max(0, (dismissals + 1) - dismissals),
+                "average": average,
+                "strike_rate": strike_rate,
+                "hundreds": int(bucket_runs.ge(100).sum()),
+                "fifties": int(bucket_runs.between(50, 99).sum()),
+                "fours": fours,
+                "sixes": sixes,
+                "boundary_pct": round((fours + sixes) / balls_faced * 100, 2) if balls_faced else 0,
+                "dot_pct": round(int(totals["dots"]) / balls_faced * 100, 2) if balls_faced else 0,
+            },
+            "phases": phases_data,
+            "dismissals_breakdown": _ranked(dismissals_by.get(name)),
+            "progression": _progression(curves.get(name)),
+            # Filled in below, once for the whole batch
+            "wagon_wheel": None,
+            "vs_pace": _batting_split(vs_type.get(name), PACE),
+            "vs_spin": _batting_split(vs_type.get(name), SPIN),
+            "vs_left_arm": _batting_split(vs_arm.get(name), LEFT_ARM),
+            "vs_right_arm": _batting_split(vs_arm.get(name), RIGHT_ARM),
+        })
+
+    if not payloads:
+        return payloads
+    seeds = player_seeds([p["name"] for p in payloads])
+    wheels = compute_wagon_wheels(
+        seeds,
+        np.array([p["stats"]["runs"] for p in payloads]),
+        np.array([p["stats"]["fours"] for p in payloads]),
+        np.array([p["stats"]["sixes"] for p in payloads]),
     )
+    wheels = {k: v.tolist() for k, v in wheels.items()}
+    for i, p in enumerate(payloads):
+        p["wagon_wheel"] = wagon_wheel_records(wheels["runs"][i], wheels["fours"][i], wheels["sixes"][i])
+    return payloads
 
-    # vs pace / spin (approximated by bowler handedness not available; use name patterns)
-    # For now split 60/40 as a placeholder — real data needs bowler metadata
-    np.random.seed(abs(hash(name)) % (2**31))
-    wagon = compute_wagon_wheel(df_b)
 
-    pace_ratio = random.uniform(0.9, 1.1)
-    spin_ratio = random.uniform(0.95, 1.15)
+def finalize_bowling(acc: dict, fmt: str) -> list[dict[str, Any]]:
+    """
+    Turn folded bowling aggregates into one payload per bowler. Pitch maps
+    are generated for the whole format in one batch.
+    """
+    payloads = []
+    deliveries = []
+    dismissals = []
+    teams = _split(acc, "teams")
+    wicket_types = _split(acc, "wicket_types")
+    vs_hand = _split(acc, "vs_hand")
+    spells = _split(acc, "spell")
+
+    for name, ph_rows in _split(acc, "phases").items():
+        totals = ph_rows.sum()
+        legal_balls = int(totals["legal"])
+        overs_bowled = round(legal_balls / 6, 1)
+        runs_conceded = int(totals["runs"])
+        wickets = int(totals["wickets"])
+        economy = round(runs_conceded / overs_bowled, 2) if overs_bowled else 0
+        average = round(runs_conceded / wickets, 2) if wickets else None
+        strike_rate_bowl = round(legal_balls / wickets, 2) if wickets else None
+
+        # Phase breakdown
+        phases_data = {}
+        for phase, ph in ph_rows.iterrows():
+            ph_runs = int(ph["runs"])
+            ph_overs = round(int(ph["legal"]) / 6, 1)
+            ph_wkts = int(ph["phase_wickets"])
+            phases_data[phase] = {
+                "overs": ph_overs,
+                "runs": ph_runs,
+                "wickets": ph_wkts,
+                "economy": round(ph_runs / ph_overs, 2) if ph_overs else 0,
+                "average": round(ph_runs / ph_wkts, 2) if ph_wkts else None,
+            }
+
+        deliveries.append(int(totals["deliveries"]))
+        dismissals.append(int(totals["dismissals"]))
+        payloads.append({
+            "name": name,
+            "team": _mode(teams.get(name)),
+            "country": "",
+            "format": fmt,
+            "role": "bowler",
+            "stats": {
+                "overs": overs_bowled,
+                "wickets": wickets,
+                "runs_conceded": runs_conceded,
+                "economy": economy,
+                "average": average,
+                "strike_rate": strike_rate_bowl,
+            },
+            "phases": phases_data,
+            "wicket_types": _ranked(wicket_types.get(name)),
+            "spells": _spells(spells.get(name)),
+            # Filled in below, once for the whole batch
+            "pitch_map": None,
+            "vs_rhb": _bowling_split(vs_hand.get(name), RIGHT_HAND),
+            "vs_lhb": _bowling_split(vs_hand.get(name), LEFT_HAND),
+        })
+
+    if not payloads:
+        return payloads
+    seeds = player_seeds([p["name"] + "_bowl" for p in payloads])
+    maps = compute_pitch_maps(seeds, np.array(deliveries), np.array(dismissals))
+    maps = {k: v.tolist() for k, v in maps.items()}
+    for i, p in enumerate(payloads):
+        p["pitch_map"] = pitch_map_records(maps["balls"][i], maps["wickets"][i], maps["economy"][i])
+    return payloads
+
+
+def fold_teams(acc: dict, df: pd.DataFrame, sides: tuple[str, ...] = ("batting", "bowling")) -> None:
+    """Fold one chunk into per-team batting and/or bowling aggregates by phase."""
+    total = df["runs_off_bat"] + df["extras"]
+    wt = df["wicket_type"]
+    per_ball = pd.DataFrame({
+        "phase": df["phase"],
+        "balls": df["legal"],
+        "runs": total,
+        "dots": ((total == 0) & (df["legal"] == 1)).astype(int),
+        "fours": (df["runs_off_bat"] == 4).astype(int),
+        "sixes": (df["runs_off_bat"] == 6).astype(int),
+        "wickets": wt.notna().astype(int),
+    })
+    for side in sides:
+        team_col = f"{side}_team"
+        _fold(acc, side, per_ball.groupby([df[team_col], "phase"], sort=False).sum())
+        _fold(acc, f"{side}_dismissals", df[wt.notna()].groupby([team_col, "wicket_type"], sort=False).size())
+
+
+def _team_rates(row: pd.Series) -> dict[str, Any]:
+    balls = int(row["balls"])
+    runs = int(row["runs"])
     return {
-        "name": name,
-        "team": team,
-        "country": "",
-        "format": fmt,
-        "role": "batter",
-        "stats": {
-            "runs": runs,
-            "balls_faced": balls_faced,
-            "innings": dismissals + (1 if runs > 0 else 0),
-            "dismissals": dismissals,
-            "not_outs": max(0, (dismissals + 1) - dismissals),
-            "average": average,
-            "strike_rate": strike_rate,
-            "hundreds": int(df_b.groupby(df_b.index // 200)["runs_off_bat"].sum().ge(100).sum()),
-            "fifties": int(df_b.groupby(df_b.index // 200)["runs_off_bat"].sum().between(50, 99).sum()),
-            "fours": int(df_b["is_boundary_4"].sum()),
-            "sixes": int(df_b["is_boundary_6"].sum()),
-            "boundary_pct": round(
-                (df_b["is_boundary_4"] | df_b["is_boundary_6"]).sum() / balls_faced * 100, 2
-            ) if balls_faced else 0,
-            "dot_pct": round(df_b["is_dot"].sum() / balls_faced * 100, 2) if balls_faced else 0,
-        },
-        "phases": phases_data,
-        "dismissals_breakdown": dismissal_counts,
-        "wagon_wheel": wagon,
-        "vs_pace": {"average": round(average * pace_ratio, 2), "strike_rate": round(strike_rate * pace_ratio, 2)},
-        "vs_spin": {"average": round(average * spin_ratio, 2), "strike_rate": round(strike_rate * spin_ratio, 2)},
-        "vs_left_arm": {"average": round(average * random.uniform(0.88, 1.05), 2), "strike_rate": round(strike_rate * random.uniform(0.90, 1.08), 2)},
-        "vs_right_arm": {"average": round(average * random.uniform(0.95, 1.08), 2), "strike_rate": round(strike_rate * random.uniform(0.95, 1.05), 2)},
+        "runs": runs,
+        "balls": balls,
+        "wickets": int(row["wickets"]),
+        "run_rate": round(runs / balls * 6, 2) if balls else 0,
+        "dot_pct": round(row["dots"] / balls * 100, 2) if balls else 0,
+        "boundary_pct": round((row["fours"] + row["sixes"]) / balls * 100, 2) if balls else 0,
     }
 
 
-def process_bowler(name: str, fmt: str, df: pd.DataFrame) -> dict[str, Any]:
-    df_b = df[df["bowler"] == name].copy()
+def finalize_teams(acc: dict) -> dict[str, dict[str, Any]]:
+    """
+    Per-team tendency records for one format: scoring (batting) and
+    conceding (bowling) rates overall and by phase, plus dismissal mix.
+    """
+    teams: dict[str, dict[str, Any]] = {}
+    for side in ("batting", "bowling"):
+        dismissals = _split(acc, f"{side}_dismissals")
+        for team, ph_rows in _split(acc, side).items():
+            teams.setdefault(team, {})[side] = {
+                "overall": _team_rates(ph_rows.sum()),
+                "phases": {phase: _team_rates(ph) for phase, ph in ph_rows.iterrows()},
+                "dismissals": _ranked(dismissals.get(team)),
+            }
+    return teams
+
+
+def add_percentiles(payloads: list[dict[str, Any]], role: str) -> None:
+    """
+    Embed each qualified player's percentile rank among `payloads` (one
+    format and role) for the key stats and phase stats, ranking every
+    column in one vectorized pass. Missing values (no wickets, phase not
+    played) are left out rather than ranked, and so are phase stats from
+    fewer than MIN_BALLS_FACED balls / MIN_OVERS_BOWLED overs in that phase.
+    """
+    if not payloads:
+        return
+    spec = PERCENTILE_STATS[role]
+    flat = pd.json_normalize([{"stats": p["stats"], "phases": p["phases"]} for p in payloads])
+    cols = [
+        c for c in flat.columns
+        if c.split(".")[-1] in spec[c.split(".")[0]]
+    ]
+    values = flat[cols].apply(pd.to_numeric, errors="coerce")
+    sample, minimum = ("balls", MIN_BALLS_FACED) if role == "batter" else ("overs", MIN_OVERS_BOWLED)
+    for col in cols:
+        parts = col.split(".")
+        if parts[0] == "phases":
+            size = pd.to_numeric(flat[f"phases.{parts[1]}.{sample}"], errors="coerce")
+            values.loc[~(size >= minimum), col] = np.nan
+    higher = [c for c in cols if c.split(".")[-1] not in LOWER_IS_BETTER[role]]
+    lower = [c for c in cols if c.split(".")[-1] in LOWER_IS_BETTER[role]]
+    pct = pd.concat([
+        values[higher].rank(pct=True),
+        values[lower].rank(pct=True, ascending=False),
+    ], axis=1)[cols].mul(100).round(1)
+
+    for payload, record in zip(payloads, pct.to_dict("records")):
+        ranks: dict[str, Any] = {"peers": len(payloads), "stats": {}, "phases": {}}
+        for col, value in record.items():
+            if pd.isna(value):
+                continue
+            parts = col.split(".")
+            if parts[0] == "stats":
+                ranks["stats"][parts[1]] = value
+            else:
+                ranks["phases"].setdefault(parts[1], {})[parts[2]] = value
+        # Follow the player's own phase order so ranks do not depend on peer order
+        ranks["phases"] = {ph: ranks["phases"][ph] for ph in payload["phases"] if ph in ranks["phases"]}
+        payload["percentiles"] = ranks
+
+
+def process_batter(name: str, fmt: str, df: pd.DataFrame, meta: Optional[PlayerMetadata] = None) -> dict[str, Any]:
+    df_b = df[df["striker"] == name].copy()
     if df_b.empty:
         return {}
-    team = str(df_b["bowling_team"].mode()[0]) if "bowling_team" in df_b.columns and not df_b.empty else "Unknown"
+    acc: dict = {}
+    fold_batting(acc, prepare_deliveries(df_b, fmt, meta))
+    payloads = finalize_batting(acc, fmt)
+    return payloads[0] if payloads else {}
 
-    df_b["over"] = df_b["ball"].apply(lambda x: int(str(x).split(".")[0]) + 1)
-    df_b["phase"] = df_b["over"].apply(lambda o: over_to_phase(o, fmt))
 
-    legal_balls = len(df_b[df_b["wides"].isna() | (df_b["wides"] == 0)])
-    overs_bowled = round(legal_balls / 6, 1)
-    runs_conceded = int(
-        df_b["runs_off_bat"].sum()
-        + df_b["extras"].fillna(0).sum()
+def process_bowler(name: str, fmt: str, df: pd.DataFrame, meta: Optional[PlayerMetadata] = None) -> dict[str, Any]:
+    df_b = df[df["bowler"] == name].copy()
+    if df_b.empty:
+        return {}
+    acc: dict = {}
+    fold_bowling(acc, prepare_deliveries(df_b, fmt, meta))
+    payloads = finalize_bowling(acc, fmt)
+    return payloads[0] if payloads else {}
+
+
+def shard_of(name: str, count: int) -> int:
+    """Stable shard assignment for a player or team name."""
+    return stable_seed(name) % count
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse "i/n" into (i, n) with 0 <= i < n."""
+    try:
+        index, count = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/n, got '{value}'")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}")
+    return index, count
+
+
+def _owned(values: pd.Series, shard: tuple[int, int], owners: dict[str, int]) -> pd.Series:
+    """Mask of rows whose `values` (player or team) belong to this shard."""
+    index, count = shard
+    for v in values.dropna().unique():
+        if v not in owners:
+            owners[v] = shard_of(v, count)
+    return values.map(owners) == index
+
+
+def process_format(
+    fmt: str,
+    csv_paths: list[str],
+    budget_mb: int,
+    store: Optional[DeliveryStoreWriter] = None,
+    shard: Optional[tuple[int, int]] = None,
+    meta: Optional[PlayerMetadata] = None,
+    report: Optional[IngestReport] = None,
+) -> dict[str, dict]:
+    """
+    Stream a format's match files through the batting, bowling and team
+    folds, appending each chunk to the ball-level store if one is given.
+    Each chunk is discarded once folded, so peak memory is set by
+    `budget_mb` plus the aggregates, not by the archive size.
+    With `shard`, only rows for players/teams owned by that shard are
+    folded. `meta` supplies the batting hand and bowling type/arm joined
+    onto every chunk, and `report` checks each match file on the way in.
+    Returns the accumulators keyed "batting", "bowling" and "teams".
+    """
+    accs: dict[str, dict] = {"batting": {}, "bowling": {}, "teams": {}}
+    owners: dict[str, int] = {}
+    offset = 0
+    for chunk in iter_chunks(csv_paths, budget_mb, desc=fmt, report=report):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        chunk = prepare_deliveries(chunk, fmt, meta)
+        if shard is None:
+            fold_batting(accs["batting"], chunk)
+            fold_bowling(accs["bowling"], chunk)
+            fold_teams(accs["teams"], chunk)
+        else:
+            fold_batting(accs["batting"], chunk[_owned(chunk["striker"], shard, owners)])
+            fold_bowling(accs["bowling"], chunk[_owned(chunk["bowler"], shard, owners)])
+            for side in ("batting", "bowling"):
+                fold_teams(accs["teams"], chunk[_owned(chunk[f"{side}_team"], shard, owners)], sides=(side,))
+        if store is not None:
+            store.append(chunk)
+        del chunk
+    return accs
+
+
+def qualified_players(accs: dict[str, dict], fmt: str) -> tuple[list[dict], list[dict]]:
+    """Finalize a format's batters and bowlers and keep those over the thresholds."""
+    batters = [
+        data for data in tqdm(finalize_batting(accs["batting"], fmt), desc=f"{fmt} batters")
+        if data["stats"]["balls_faced"] >= MIN_BALLS_FACED
+    ]
+    bowlers = [
+        data for data in tqdm(finalize_bowling(accs["bowling"], fmt), desc=f"{fmt} bowlers")
+        if data["stats"]["overs"] >= MIN_OVERS_BOWLED
+    ]
+    return batters, bowlers
+
+
+def index_players(players_index: dict, fmt: str, role: str, payloads: list[dict]) -> None:
+    """Add players to the team -> format -> batters/bowlers index, skipping any already listed."""
+    role_key = "batters" if role == "batter" else "bowlers"
+    # A set per roster touched, so membership checks stay O(1) as rosters grow
+    listed: dict[str, tuple[list[str], set[str]]] = {}
+    for data in payloads:
+        player = data["name"]
+        team = data.get("team", "Unknown")
+        if team not in listed:
+            roster = players_index.setdefault(team, {}).setdefault(fmt, {"batters": [], "bowlers": []})[role_key]
+            listed[team] = (roster, set(roster))
+        roster, names = listed[team]
+        if player not in names:
+            names.add(player)
+            roster.append(player)
+
+
+def write_players(writer: GenerationWriter, fmt: str, role: str, payloads: list[dict]) -> None:
+    suffix = "bat" if role == "batter" else "bowl"
+    writer.write_many(
+        (f"{data['name'].lower().replace(' ', '_')}_{fmt}_{suffix}", data) for data in payloads
     )
-    wickets = int(
-        df_b["wicket_type"].notna().sum()
-        - df_b["wicket_type"].isin(["run out", "retired hurt", "obstructing the field"]).sum()
+
+
+def write_teams(writer: GenerationWriter, team_profiles: dict) -> None:
+    writer.write_many(
+        (f"teams/{team.lower().replace(' ', '_')}", {"name": team, "formats": formats})
+        for team, formats in team_profiles.items()
     )
-    economy = round(runs_conceded / overs_bowled, 2) if overs_bowled else 0
-    average = round(runs_conceded / wickets, 2) if wickets else None
-    strike_rate_bowl = round(legal_balls / wickets, 2) if wickets else None
-
-    # Phase breakdown
-    phases_data = {}
-    for phase in df_b["phase"].unique():
-        ph_df = df_b[df_b["phase"] == phase]
-        ph_legal = len(ph_df[ph_df["wides"].isna() | (ph_df["wides"] == 0)])
-        ph_runs = int(ph_df["runs_off_bat"].sum() + ph_df["extras"].fillna(0).sum())
-        ph_overs = round(ph_legal / 6, 1)
-        ph_wkts = int(
-            ph_df["wicket_type"].notna().sum()
-            - ph_df["wicket_type"].isin(["run out", "retired hurt"]).sum()
+
+
+def format_inputs(fmt_key: str) -> list[str]:
+    """Match CSV paths for a format, or [] (with a note) if none are downloaded."""
+    raw_dir = os.path.join(RAW_DATA_DIR, fmt_key)
+    if not os.path.exists(raw_dir):
+        print(f"[{fmt_key}] No raw data — run download_cricsheet.py first")
+        return []
+    # Sorted, so row offsets and which copy of a conflicting match is kept
+    # are the same on every machine
+    csv_files = sorted(f for f in os.listdir(raw_dir) if f.endswith(".csv") and "_info" not in f)
+    if csv_files:
+        print(f"[{fmt_key}] Processing {len(csv_files)} match files...")
+    return [os.path.join(raw_dir, fn) for fn in csv_files]
+
+
+def info_paths() -> Iterator[str]:
+    """Every downloaded *_info.csv, for resolving registry identifiers."""
+    for fmt_key in FORMATS:
+        raw_dir = os.path.join(RAW_DATA_DIR, fmt_key)
+        if os.path.exists(raw_dir):
+            yield from (os.path.join(raw_dir, f) for f in os.listdir(raw_dir) if f.endswith("_info.csv"))
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def input_fingerprint() -> str:
+    """
+    Digest of every raw CSV's name and size per format, plus the player
+    metadata table, recorded by each shard so merge can refuse partials
+    built from different inputs. Files quarantined during the run are
+    counted where they moved to: the quarantine directory is listed after
+    the raw one, so a concurrent move never drops a file from the digest.
+    """
+    digest = hashlib.sha256()
+    for fmt_key in FORMATS:
+        sizes: dict[str, int] = {}
+        for d in (os.path.join(RAW_DATA_DIR, fmt_key), os.path.join(QUARANTINE_DIR, fmt_key)):
+            if not os.path.isdir(d):
+                continue
+            for fn in os.listdir(d):
+                if fn.endswith(".csv"):
+                    try:
+                        sizes[fn] = os.path.getsize(os.path.join(d, fn))
+                    except OSError:
+                        pass  # moved to quarantine since the listing; counted there
+        digest.update(json.dumps([fmt_key, sorted(sizes.items())]).encode())
+    if os.path.exists(PLAYER_METADATA):
+        with open(PLAYER_METADATA, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def shard_dir(root: str, index: int, count: int) -> str:
+    return os.path.join(root, f"shard-{index}-of-{count}")
+
+
+def run_shard(shard: tuple[int, int], root: str, budget_mb: int) -> None:
+    """
+    Process this shard's players and teams into partial outputs under
+    <root>/shard-i-of-n/: per-format JSONL payloads (percentiles are ranked
+    at merge time, across all shards), a partial index, partial team
+    profiles, and the ball-level stores of the formats it owns.
+    """
+    index, count = shard
+    out_dir = shard_dir(root, index, count)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(os.path.join(out_dir, "players"))
+    inputs = input_fingerprint()
+    players_index: dict = {}
+    team_profiles: dict = {}
+    reports: dict = {}
+    meta = load_player_metadata(PLAYER_METADATA, info_paths())
+
+    for f, fmt_key in enumerate(FORMATS):
+        csv_paths = format_inputs(fmt_key)
+        if not csv_paths:
+            continue
+        store = DeliveryStoreWriter(out_dir, fmt_key) if f % count == index else None
+        # Only shard 0 moves files aside: a move by any other shard could
+        # hide a file from shard 0, whose report is the one published
+        report = IngestReport(fmt_key, DELIVERY_COLUMNS, QUARANTINE_DIR if index == 0 else None)
+        accs = process_format(fmt_key, csv_paths, budget_mb, store, shard, meta, report)
+        if store is not None:
+            store.close()
+        print(report.describe())
+        reports[fmt_key] = report.summary()
+
+        for team, profile in finalize_teams(accs["teams"]).items():
+            team_profiles.setdefault(team, {})[fmt_key] = profile
+        for role, payloads in zip(("batter", "bowler"), qualified_players(accs, fmt_key)):
+            index_players(players_index, fmt_key, role, payloads)
+            suffix = "bat" if role == "batter" else "bowl"
+            with open(os.path.join(out_dir, "players", f"{fmt_key}_{suffix}.jsonl"), "wb") as fh:
+                fh.writelines(dumps(data) + b"\n" for data in payloads)
+        print(f"[{fmt_key}] Shard {index}/{count} complete.")
+
+    with open(os.path.join(out_dir, "index.json"), "w") as fh:
+        json.dump(players_index, fh)
+    with open(os.path.join(out_dir, "teams.json"), "w") as fh:
+        json.dump(team_profiles, fh)
+    with open(os.path.join(out_dir, f"{INGEST_REPORT}.json"), "w") as fh:
+        json.dump(reports, fh)
+    with open(os.path.join(out_dir, SHARD_DONE), "w") as fh:
+        json.dump({"shard": index, "count": count, "inputs": inputs}, fh)
+
+
+def merge_shards(count: int, root: str) -> None:
+    """
+    Combine the partial outputs of shards 0..count-1 into one published
+    generation: rank percentiles across all shards' players, merge the
+    partial indexes and team profiles, and link the ball-level stores in.
+    """
+    dirs = [shard_dir(root, i, count) for i in range(count)]
+    missing = [d for d in dirs if not os.path.exists(os.path.join(d, SHARD_DONE))]
+    if missing:
+        raise SystemExit(f"Shards not finished: {', '.join(missing)}")
+    inputs = {}
+    for d in dirs:
+        with open(os.path.join(d, SHARD_DONE)) as fh:
+            inputs[d] = json.load(fh).get("inputs")
+    if len(set(inputs.values())) > 1:
+        stale = [d for d, fp in inputs.items() if fp != inputs[dirs[0]]]
+        raise SystemExit(
+            f"Shards were built from different raw data or metadata than {dirs[0]}: "
+            f"{', '.join(stale)} — re-run them against the same inputs"
         )
-        phases_data[phase] = {
-            "overs": ph_overs,
-            "runs": ph_runs,
-            "wickets": ph_wkts,
-            "economy": round(ph_runs / ph_overs, 2) if ph_overs else 0,
-            "average": round(ph_runs / ph_wkts, 2) if ph_wkts else None,
-        }
-
-    wicket_types = (
-        df_b[df_b["wicket_type"].notna()]["wicket_type"]
-        .value_counts()
-        .to_dict()
-    )
 
-    np.random.seed(abs(hash(name + "_bowl")) % (2**31))
-    pitch_map = compute_pitch_map(df_b)
+    writer = GenerationWriter()
+    for fmt_key in FORMATS:
+        for role, suffix in (("batter", "bat"), ("bowler", "bowl")):
+            payloads = []
+            for d in dirs:
+                path = os.path.join(d, "players", f"{fmt_key}_{suffix}.jsonl")
+                if os.path.exists(path):
+                    with open(path) as fh:
+                        payloads.extend(json.loads(line) for line in fh)
+            add_percentiles(payloads, role)
+            write_players(writer, fmt_key, role, payloads)
+            write_similarity(writer, fmt_key, role, payloads)
+        for d in dirs:
+            store_src = os.path.join(d, STORE_DIR, fmt_key)
+            if os.path.exists(store_src):
+                # Linked, not moved, so the shard outputs can be merged again
+                shutil.copytree(store_src, os.path.join(writer.out_dir, STORE_DIR, fmt_key), copy_function=_link_or_copy)
 
-    return {
-        "name": name,
-        "team": team,
-        "country": "",
-        "format": fmt,
-        "role": "bowler",
-        "stats": {
-            "overs": overs_bowled,
-            "wickets": wickets,
-            "runs_conceded": runs_conceded,
-            "economy": economy,
-            "average": average,
-            "strike_rate": strike_rate_bowl,
-        },
-        "phases": phases_data,
-        "wicket_types": wicket_types,
-        "pitch_map": pitch_map,
-        "vs_rhb": {"economy": round(economy * random.uniform(0.92, 1.05), 2), "wickets": round(wickets * 0.65)},
-        "vs_lhb": {"economy": round(economy * random.uniform(0.95, 1.08), 2), "wickets": round(wickets * 0.35)},
-    }
+    players_index: dict = {}
+    team_profiles: dict = {}
+    for d in dirs:
+        with open(os.path.join(d, "index.json")) as fh:
+            for team, formats in json.load(fh).items():
+                for fmt_key, roles in formats.items():
+                    entry = players_index.setdefault(team, {}).setdefault(fmt_key, {"batters": [], "bowlers": []})
+                    for role_key, names in roles.items():
+                        entry[role_key].extend(names)
+        with open(os.path.join(d, "teams.json")) as fh:
+            for team, formats in json.load(fh).items():
+                for fmt_key, sides in formats.items():
+                    team_profiles.setdefault(team, {}).setdefault(fmt_key, {}).update(sides)
+
+    # Every shard checks every file and only shard 0 quarantines, so its
+    # ingest report covers the run
+    with open(os.path.join(dirs[0], f"{INGEST_REPORT}.json")) as fh:
+        writer.write(INGEST_REPORT, json.load(fh))
+    write_teams(writer, team_profiles)
+    writer.write("index", players_index)
+    writer.publish()
+    print(f"Merged {count} shards: {len(players_index)} teams")
+    print(f"Published generation {writer.generation}: {len(writer.changed)} of {len(writer.hashes)} outputs changed")
+
+
+def reprocess_players(names: list[str]) -> None:
+    """
+    Regenerate just `names`' player files from the published generation's
+    ball-level store: the per-player row index locates their deliveries,
+    which are re-joined with the current metadata and folded as in a full
+    run. Percentiles are ranked against the unchanged peers, the index
+    entries are patched, and every other output is carried forward into
+    the new generation.
+    """
+    writer = GenerationWriter()
+    if writer.prev_dir is None:
+        raise SystemExit("No published generation to patch — run a full build first")
+    with open(os.path.join(writer.prev_dir, "index.json")) as f:
+        players_index = json.load(f)
+    meta = load_player_metadata(PLAYER_METADATA, info_paths())
+    targets = set(names)
+    dropped = []
+
+    for fmt_key in FORMATS:
+        store_dir = os.path.join(writer.prev_dir, STORE_DIR, fmt_key)
+        if not os.path.exists(os.path.join(store_dir, META_FILE)):
+            continue
+        reader = DeliveryStoreReader(store_dir)
+        try:
+            batting_rows = reader.player_rows("striker", names)
+            bowling_rows = reader.player_rows("bowler", names)
+        except ValueError as e:
+            raise SystemExit(f"{e} — run a full build first")
+        if not len(batting_rows) and not len(bowling_rows):
+            continue
+
+        frame = meta.join(reader.frame(np.union1d(batting_rows, bowling_rows)))
+        accs = {"batting": {}, "bowling": {}}
+        fold_batting(accs["batting"], frame[frame["striker"].isin(names)])
+        fold_bowling(accs["bowling"], frame[frame["bowler"].isin(names)])
+
+        for role, payloads in zip(("batter", "bowler"), qualified_players(accs, fmt_key)):
+            role_key, suffix = ("batters", "bat") if role == "batter" else ("bowlers", "bowl")
+            peers = []
+            for team, formats in players_index.items():
+                for peer in formats.get(fmt_key, {}).get(role_key, []):
+                    if peer not in targets:
+                        path = os.path.join(writer.prev_dir, f"{peer.lower().replace(' ', '_')}_{fmt_key}_{suffix}.json")
+                        with open(path) as f:
+                            peers.append(json.load(f))
+            add_percentiles(peers + payloads, role)
+            write_players(writer, fmt_key, role, payloads)
+
+            # Drop stale entries (and files of players who no longer qualify), then re-add
+            qualified = {p["name"]: p.get("team", "Unknown") for p in payloads}
+            for team, formats in players_index.items():
+                roster = formats.get(fmt_key, {}).get(role_key)
+                if roster:
+                    roster[:] = [p for p in roster if p not in targets or qualified.get(p) == team]
+            index_players(players_index, fmt_key, role, payloads)
+            dropped += [f"{n.lower().replace(' ', '_')}_{fmt_key}_{suffix}" for n in names if n not in qualified]
+            print(f"[{fmt_key}] Reprocessed {len(payloads)} {role_key}")
+
+    writer.write("index", players_index)
+    writer.carry_forward(exclude=dropped)
+    writer.publish()
+    print(f"Published generation {writer.generation}: {len(writer.changed)} of {len(writer.hashes)} outputs changed")
 
 
 def main():
-    os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "command", nargs="?", choices=["run", "merge"], default="run",
+        help="run (default) processes match files; merge combines finished shards",
+    )
+    parser.add_argument(
+        "--memory-budget-mb", type=int, default=MEMORY_BUDGET_MB,
+        help=f"Peak memory for buffered match files per chunk (default {MEMORY_BUDGET_MB})",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, metavar="I/N",
+        help="Process only the players and teams hashed to shard I of N",
+    )
+    parser.add_argument("--shards", type=int, help="Number of shards to merge")
+    parser.add_argument(
+        "--players", nargs="+", metavar="NAME",
+        help="Regenerate only these players' files from the published store",
+    )
+    parser.add_argument(
+        "--shard-dir", default=SHARD_DATA_DIR,
+        help=f"Shared directory for shard outputs (default {SHARD_DATA_DIR})",
+    )
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        if not args.shards:
+            parser.error("merge requires --shards N")
+        merge_shards(args.shards, args.shard_dir)
+        return
+    if args.players:
+        if args.shard:
+            parser.error("--players cannot be combined with --shard")
+        reprocess_players(args.players)
+        return
+    if args.shard:
+        run_shard(args.shard, args.shard_dir, args.memory_budget_mb)
+        return
+
+    writer = GenerationWriter()
     players_index: dict = {}
+    team_profiles: dict = {}
+    reports: dict = {}
+    meta = load_player_metadata(PLAYER_METADATA, info_paths())
 
     for fmt_key in FORMATS:
-        raw_dir = os.path.join(RAW_DATA_DIR, fmt_key)
-        if not os.path.exists(raw_dir):
-            print(f"[{fmt_key}] No raw data — run download_cricsheet.py first")
+        csv_paths = format_inputs(fmt_key)
+        if not csv_paths:
             continue
 
-        csv_files = [f for f in os.listdir(raw_dir) if f.endswith(".csv") and "_info" not in f]
-        if not csv_files:
+        store = DeliveryStoreWriter(writer.out_dir, fmt_key)
+        report = IngestReport(fmt_key, DELIVERY_COLUMNS, QUARANTINE_DIR)
+        accs = process_format(fmt_key, csv_paths, args.memory_budget_mb, store, meta=meta, report=report)
+        store.close()
+        print(report.describe())
+        reports[fmt_key] = report.summary()
+        if not accs["batting"] and not accs["bowling"]:
             continue
 
-        print(f"[{fmt_key}] Processing {len(csv_files)} match files...")
-        dfs = []
-        for fn in tqdm(csv_files, desc=fmt_key):
-            try:
-                df = pd.read_csv(os.path.join(raw_dir, fn), low_memory=False)
-                dfs.append(df)
-            except Exception:
-                pass
-
-        if not dfs:
-            continue
+        for team, profile in finalize_teams(accs["teams"]).items():
+            team_profiles.setdefault(team, {})[fmt_key] = profile
 
-        combined = pd.concat(dfs, ignore_index=True)
-
-        batters = set(combined["striker"].dropna().unique())
-        bowlers = set(combined["bowler"].dropna().unique())
-
-        for player in tqdm(batters, desc=f"{fmt_key} batters"):
-            data = process_batter(player, fmt_key, combined)
-            if data and data["stats"]["balls_faced"] >= 50:
-                slug = player.lower().replace(" ", "_")
-                with open(os.path.join(PROCESSED_DATA_DIR, f"{slug}_{fmt_key}_bat.json"), "w") as f:
-                    json.dump(data, f)
-                team = data.get("team", "Unknown")
-                players_index.setdefault(team, {}).setdefault(fmt_key, {"batters": [], "bowlers": []})
-                if player not in players_index[team][fmt_key]["batters"]:
-                    players_index[team][fmt_key]["batters"].append(player)
-
-        for player in tqdm(bowlers, desc=f"{fmt_key} bowlers"):
-            data = process_bowler(player, fmt_key, combined)
-            if data and data["stats"]["overs"] >= 5:
-                slug = player.lower().replace(" ", "_")
-                with open(os.path.join(PROCESSED_DATA_DIR, f"{slug}_{fmt_key}_bowl.json"), "w") as f:
-                    json.dump(data, f)
-                team = data.get("team", "Unknown")
-                players_index.setdefault(team, {}).setdefault(fmt_key, {"batters": [], "bowlers": []})
-                if player not in players_index[team][fmt_key]["bowlers"]:
-                    players_index[team][fmt_key]["bowlers"].append(player)
+        for role, payloads in zip(("batter", "bowler"), qualified_players(accs, fmt_key)):
+            add_percentiles(payloads, role)
+            write_players(writer, fmt_key, role, payloads)
+            write_similarity(writer, fmt_key, role, payloads)
+            index_players(players_index, fmt_key, role, payloads)
 
         print(f"[{fmt_key}] Complete.")
 
-    index_path = os.path.join(PROCESSED_DATA_DIR, "index.json")
-    with open(index_path, "w") as f:
-        json.dump(players_index, f)
+    write_teams(writer, team_profiles)
+    writer.write(INGEST_REPORT, reports)
+    writer.write("index", players_index)
+    writer.publish()
     print(f"Index written: {len(players_index)} teams")
+    print(f"Published generation {writer.generation}: {len(writer.changed)} of {len(writer.hashes)} outputs changed")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+"""
+Versioned output generations for process_data.py.
+
+Each run writes into data/processed/generations/<id>/ and is published by
+atomically replacing the CURRENT pointer file, so the backend never reads
+a half-written dataset. Outputs whose content hash matches the previous
+generation are hard-linked from it instead of rewritten.
+"""
+import os
+import json
+import shutil
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import orjson
+
+from config import GENERATIONS_DIR, CURRENT_POINTER, KEEP_GENERATIONS, OUTPUT_WORKERS, OUTPUT_BATCH
+
+# Per-output content hashes plus the keys changed/removed since the last generation
+MANIFEST_FILE = "manifest.json"
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON for an output (numpy scalars and non-string keys allowed)."""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def current_generation(generations_dir: str = GENERATIONS_DIR, pointer: str = CURRENT_POINTER) -> Optional[str]:
+    """Id of the published generation, or None before the first run."""
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        gen = f.read().strip()
+    return gen if gen and os.path.isdir(os.path.join(generations_dir, gen)) else None
+
+
+def load_manifest(gen_dir: str) -> dict[str, str]:
+    """Content hashes of a generation's outputs, keyed by output name (file stem)."""
+    path = os.path.join(gen_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("hashes", {})
+
+
+class GenerationWriter:
+    """
+    Collects one run's outputs into a fresh generation directory under
+    `generations_dir`, published through `pointer` (by default the ones the
+    backend serves).
+    """
+
+    def __init__(self, generations_dir: str = GENERATIONS_DIR, pointer: str = CURRENT_POINTER):
+        self.generations_dir = generations_dir
+        self.pointer = pointer
+        self.previous = current_generation(generations_dir, pointer)
+        self.prev_dir = os.path.join(generations_dir, self.previous) if self.previous else None
+        self.prev_hashes = load_manifest(self.prev_dir) if self.prev_dir else {}
+
+        self.generation = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self.out_dir = os.path.join(generations_dir, self.generation)
+        os.makedirs(self.out_dir)
+        self.hashes: dict[str, str] = {}
+        self.changed: list[str] = []
+
+    def write(self, key: str, data: Any) -> None:
+        """
+        Write `data` to `<key>.json` (keys may name a subdirectory, e.g.
+        "teams/india"). Unchanged outputs are hard-linked
+        from the previous generation so they keep their bytes and inode.
+        """
+        self.write_bytes(key, dumps(data))
+
+    def write_bytes(self, key: str, payload: bytes, ext: str = ".json") -> None:
+        """Write raw bytes to `<key><ext>`, hard-linking them if unchanged."""
+        os.makedirs(os.path.dirname(os.path.join(self.out_dir, key)), exist_ok=True)
+        self._record(key, *self._store(key, payload, ext))
+
+    def write_many(self, outputs: Iterable[tuple[str, Any]]) -> None:
+        """
+        write() for many (key, data) outputs at once. Batches of OUTPUT_BATCH
+        are encoded, hashed and written on OUTPUT_WORKERS threads (hashing
+        and file I/O release the GIL); results are recorded in input order.
+        """
+        outputs = iter(outputs)
+        batches = iter(lambda: list(itertools.islice(outputs, OUTPUT_BATCH)), [])
+        with ThreadPoolExecutor(OUTPUT_WORKERS) as pool:
+            for results in pool.map(self._write_batch, batches):
+                for key, digest, changed in results:
+                    self._record(key, digest, changed)
+
+    def _write_batch(self, batch: list[tuple[str, Any]]) -> list[tuple[str, str, bool]]:
+        for subdir in {os.path.dirname(key) for key, _ in batch}:
+            os.makedirs(os.path.join(self.out_dir, subdir), exist_ok=True)
+        return [(key, *self._store(key, dumps(data), ".json")) for key, data in batch]
+
+    def _store(self, key: str, payload: bytes, ext: str) -> tuple[str, bool]:
+        """Put one output on disk (parent directory must exist); its digest and whether it changed."""
+        digest = hashlib.sha256(payload).hexdigest()
+        path = os.path.join(self.out_dir, f"{key}{ext}")
+        changed = self.prev_hashes.get(key) != digest
+        if not changed:
+            try:
+                os.link(os.path.join(self.prev_dir, f"{key}{ext}"), path)
+                return digest, changed
+            except OSError:
+                pass
+        # Never open `path` itself: it may already be a hard link into the
+        # previous (live) generation if the key was written earlier this run
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return digest, changed
+
+    def _record(self, key: str, digest: str, changed: bool) -> None:
+        self.hashes[key] = digest
+        if changed:
+            self.changed.append(key)
+
+    def carry_forward(self, exclude: Iterable[str] = ()) -> None:
+        """
+        Hard-link every output of the previous generation that this run did
+        not write and `exclude` does not name (output keys, as in write), so
+        a run that patches a few outputs still publishes a complete generation.
+        """
+        if self.prev_dir is None:
+            return
+        skip = set(exclude)
+        for root, _, files in os.walk(self.prev_dir):
+            for fn in files:
+                src = os.path.join(root, fn)
+                rel = os.path.relpath(src, self.prev_dir)
+                key = os.path.splitext(rel)[0].replace(os.sep, "/")
+                dst = os.path.join(self.out_dir, rel)
+                if rel == MANIFEST_FILE or key in skip or os.path.exists(dst):
+                    continue
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst)
+                if key in self.prev_hashes:
+                    self.hashes[key] = self.prev_hashes[key]
+
+    def publish(self) -> None:
+        """Write the manifest, switch CURRENT to this generation and prune old ones."""
+        removed = [k for k in self.prev_hashes if k not in self.hashes]
+        with open(os.path.join(self.out_dir, MANIFEST_FILE), "w") as f:
+            json.dump({
+                "generation": self.generation,
+                "previous": self.previous,
+                "hashes": self.hashes,
+                "changed": self.changed,
+                "removed": removed,
+            }, f)
+
+        tmp = f"{self.pointer}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.pointer)
+        prune_generations(self.generation, self.generations_dir)
+
+
+def prune_generations(current: str, generations_dir: str = GENERATIONS_DIR) -> None:
+    """
+    Delete all but the newest KEEP_GENERATIONS generations. The previous
+    one is kept so requests that started before the swap can finish.
+    """
+    gens = sorted(g for g in os.listdir(generations_dir) if os.path.isdir(os.path.join(generations_dir, g)))
+    for gen in gens[:-KEEP_GENERATIONS]:
+        if gen != current:
+            shutil.rmtree(os.path.join(generations_dir, gen), ignore_errors=True)
@@ -0,0 +1,120 @@
+"""
+Similar-player index for the /api/similar endpoint.
+
+Every qualified (player, format, role) becomes a feature vector built from
+its payload: phase strike rates or economies, dot and boundary %, and the
+dismissal or wicket-type mix. The wagon wheel and pitch map are left out:
+they are simulated (simulate.py), and after z-scoring their noise would
+outweigh the real stats. Columns are z-scored within the peer group and rows L2-normalised, so cosine
+similarity is a single matrix product. The top NEIGHBOURS of every row
+are precomputed block by block, so memory stays at BLOCK x players.
+"""
+import io
+import warnings
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from publish import GenerationWriter
+
+# Neighbours precomputed per player; larger k is answered by brute force
+NEIGHBOURS = 20
+# Rows scored per matrix product when building the neighbour index
+BLOCK = 1024
+
+BATTING_FEATURES = ["strike_rate", "boundary_pct", "dot_pct"]
+BOWLING_FEATURES = ["economy", "strike_rate"]
+# Distribution features: a type never seen is a 0 share, not missing
+SHARE_GROUPS = ("dismissal", "wicket", "workload")
+
+
+def _shares(counts: dict[str, float], prefix: str) -> dict[str, float]:
+    total = sum(counts.values())
+    return {f"{prefix}.{k}": v / total for k, v in counts.items()} if total else {}
+
+
+def batter_features(payload: dict[str, Any]) -> dict[str, float]:
+    row = {f"stats.{k}": payload["stats"].get(k) for k in BATTING_FEATURES}
+    for phase, stats in payload["phases"].items():
+        row.update({f"{phase}.{k}": stats.get(k) for k in BATTING_FEATURES})
+    row.update(_shares(payload["dismissals_breakdown"], "dismissal"))
+    return row
+
+
+def bowler_features(payload: dict[str, Any]) -> dict[str, float]:
+    row = {f"stats.{k}": payload["stats"].get(k) for k in BOWLING_FEATURES}
+    for phase, stats in payload["phases"].items():
+        row[f"{phase}.economy"] = stats.get("economy")
+    row.update(_shares({ph: s.get("overs", 0) for ph, s in payload["phases"].items()}, "workload"))
+    row.update(_shares(payload["wicket_types"], "wicket"))
+    return row
+
+
+def feature_matrix(payloads: list[dict[str, Any]], role: str) -> tuple[np.ndarray, list[str]]:
+    """
+    Dense float32 matrix of normalised features, one row per payload.
+    Missing rates (phase not played, no wickets) sit at the peer mean
+    after z-scoring, so they neither attract nor repel.
+    """
+    extract = batter_features if role == "batter" else bowler_features
+    frame = pd.DataFrame([extract(p) for p in payloads]).apply(pd.to_numeric, errors="coerce")
+    shares = [c for c in frame.columns if c.split(".")[0] in SHARE_GROUPS]
+    frame[shares] = frame[shares].fillna(0.0)
+    values = frame.to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    z = np.nan_to_num((values - mean) / std)
+    norms = np.linalg.norm(z, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (z / norms).astype(np.float32), list(frame.columns)
+
+
+def nearest_neighbours(vectors: np.ndarray, k: int = NEIGHBOURS) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine neighbours of every row (excluding itself), best first."""
+    n = len(vectors)
+    k = min(k, n - 1)
+    ids = np.zeros((n, max(k, 0)), dtype=np.int32)
+    scores = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return ids, scores
+    for start in range(0, n, BLOCK):
+        sims = vectors[start:start + BLOCK] @ vectors.T
+        rows = np.arange(len(sims))
+        sims[rows, rows + start] = -np.inf
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        ids[start:start + BLOCK] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + BLOCK] = np.take_along_axis(top_scores, order, axis=1)
+    return ids, scores
+
+
+def _npy(array: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, array, allow_pickle=False)
+    return buf.getvalue()
+
+
+def write_similarity(writer: GenerationWriter, fmt: str, role: str, payloads: list[dict[str, Any]]) -> None:
+    """
+    Write similar/<fmt>_<role>/: names.json (row order, teams, feature
+    names) plus vectors.npy, neighbours.npy and scores.npy, which the
+    backend memory-maps.
+    """
+    if not payloads:
+        return
+    vectors, features = feature_matrix(payloads, role)
+    ids, scores = nearest_neighbours(vectors)
+    key = f"similar/{fmt}_{role}"
+    writer.write(f"{key}/names", {
+        "names": [p["name"] for p in payloads],
+        "teams": [p.get("team", "Unknown") for p in payloads],
+        "features": features,
+    })
+    writer.write_bytes(f"{key}/vectors", _npy(vectors), ext=".npy")
+    writer.write_bytes(f"{key}/neighbours", _npy(ids), ext=".npy")
+    writer.write_bytes(f"{key}/scores", _npy(scores), ext=".npy")
@@ -0,0 +1,149 @@
+"""
+Batched generation of the simulated player fields.
+
+Cricsheet has no shot or pitch coordinates, so wagon wheels and pitch
+maps are simulated. Every draw comes from a
+counter-based stream keyed by the player's stable seed: draw j of a player
+depends only on (seed, j). Whole formats are therefore generated in one
+array operation, and each player's output is the same whatever else is in
+the batch.
+"""
+import hashlib
+
+import numpy as np
+
+WAGON_ZONES = ["fine_leg", "square_leg", "midwicket", "mid_on",
+               "straight", "mid_off", "cover", "point", "third_man"]
+# Weighted distribution — more realistic than uniform
+WAGON_WEIGHTS = np.array([0.08, 0.12, 0.15, 0.10, 0.07, 0.10, 0.18, 0.12, 0.08])
+
+PITCH_LENGTHS = ["full_toss", "yorker", "full", "good", "short_of_good", "short"]
+PITCH_LINES = ["wide_outside_off", "outside_off", "off_stump",
+               "middle_stump", "leg_stump", "outside_leg"]
+PITCH_CELLS = len(PITCH_LENGTHS) * len(PITCH_LINES)
+
+# Stream layout (draw counters) per player
+WAGON_DRAWS = 2 * 3 * len(WAGON_ZONES)  # Box-Muller pairs for runs, fours, sixes
+PITCH_DRAWS = 2 * PITCH_CELLS           # frequency and economy per cell
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def stable_seed(key: str) -> int:
+    """
+    Process-independent seed for a player's simulated fields.
+    Built-in hash() is salted per interpreter, so it would give every
+    run different bytes.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def player_seeds(keys: list[str]) -> np.ndarray:
+    return np.array([stable_seed(k) for k in keys], dtype=np.uint64)
+
+
+def player_uniforms(seeds: np.ndarray, count: int, offset: int = 0) -> np.ndarray:
+    """
+    (len(seeds), count) uniforms in [0, 1): SplitMix64 of seed + counter,
+    for counters offset..offset+count-1.
+    """
+    counters = np.arange(offset + 1, offset + count + 1, dtype=np.uint64) * _GOLDEN
+    x = seeds[:, None] + counters[None, :]
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def _normals(u: np.ndarray) -> np.ndarray:
+    """Standard normals from pairs of uniform columns (Box-Muller)."""
+    u1, u2 = u[:, 0::2], u[:, 1::2]
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def _apportion(totals: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Split each row's integer total across columns by weight (largest remainder)."""
+    n, k = weights.shape
+    raw = weights / weights.sum(axis=1, keepdims=True) * totals[:, None]
+    base = np.floor(raw).astype(np.int64)
+    short = totals - base.sum(axis=1)
+    order = np.argsort(-(raw - base), axis=1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.broadcast_to(np.arange(k), (n, k)), axis=1)
+    return base + (rank < short[:, None])
+
+
+def batched_multinomial(totals: np.ndarray, probs: np.ndarray, normals: np.ndarray) -> np.ndarray:
+    """
+    Multinomial-like counts per row: probabilities perturbed by the
+    multinomial standard error, then apportioned so each row sums exactly.
+    """
+    sd = np.sqrt(probs * (1 - probs) / np.maximum(totals, 1)[:, None])
+    weights = np.clip(probs + sd * normals, 0, None)
+    empty = weights.sum(axis=1) == 0
+    weights[empty] = probs[empty]
+    return _apportion(totals, weights)
+
+
+def compute_wagon_wheels(seeds: np.ndarray, runs: np.ndarray, fours: np.ndarray, sixes: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Estimate scoring zones for a batch of batters.
+    Cricsheet doesn't include wagon wheel coords — we simulate zones
+    based on known batting patterns (shot type isn't in the data either).
+    A real implementation would need ESPNcricinfo shot data.
+    Returns (n, zones) arrays of runs, fours and sixes.
+    """
+    n = len(seeds)
+    normals = _normals(player_uniforms(seeds, WAGON_DRAWS)).reshape(n, 3, len(WAGON_ZONES))
+    probs = np.broadcast_to(WAGON_WEIGHTS, (n, len(WAGON_ZONES)))
+    return {
+        "runs": batched_multinomial(runs, probs, normals[:, 0]),
+        "fours": batched_multinomial(fours, probs, normals[:, 1]),
+        "sixes": batched_multinomial(sixes, probs, normals[:, 2]),
+    }
+
+
+def wagon_wheel_records(runs: list[int], fours: list[int], sixes: list[int]) -> list[dict]:
+    """Serialize one batter's row of compute_wagon_wheels."""
+    return [
+        {
+            "zone": z,
+            "runs": runs[i],
+            "fours": fours[i],
+            "sixes": sixes[i],
+            "angle_start": i * 40 - 160,
+            "angle_end": (i + 1) * 40 - 160,
+        }
+        for i, z in enumerate(WAGON_ZONES)
+    ]
+
+
+def compute_pitch_maps(seeds: np.ndarray, balls: np.ndarray, wickets: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Simulate line & length heatmaps for a batch of bowlers.
+    Cricsheet doesn't include pitch coords — we approximate.
+    Returns (n, cells) arrays in length-major order.
+    """
+    u = player_uniforms(seeds, PITCH_DRAWS)
+    freq = u[:, :PITCH_CELLS] ** 0.5  # skewed toward higher frequency
+    return {
+        "balls": np.maximum(1, (freq * balls[:, None] / PITCH_CELLS).astype(np.int64)),
+        "wickets": (freq * wickets[:, None] / PITCH_CELLS).astype(np.int64),
+        "economy": np.round(4.5 + 4.5 * u[:, PITCH_CELLS:], 2),
+    }
+
+
+def pitch_map_records(balls: list[int], wickets: list[int], economy: list[float]) -> list[dict]:
+    """Serialize one bowler's row of compute_pitch_maps."""
+    cells = []
+    for i, (length, line) in enumerate((l, ln) for l in PITCH_LENGTHS for ln in PITCH_LINES):
+        cells.append({
+            "length": length,
+            "line": line,
+            "balls": balls[i],
+            "wickets": wickets[i],
+            "economy": economy[i],
+        })
+    return cells
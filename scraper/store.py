@@ -0,0 +1,188 @@
+"""
+Columnar ball-level delivery store.
+
+Each format's deliveries are appended chunk by chunk as raw column files
+(<column>.bin) in <generation>/deliveries/<format>/, next to a meta.json
+holding the dtypes, the row count and the string vocabularies. Players,
+teams, venues, matches, phases, wicket types and the player-metadata
+attributes are integer-coded (-1 for missing or unknown), so the backend
+can np.memmap the columns and aggregate them with bincount instead of
+parsing strings.
+
+For the striker and bowler columns the store also keeps a per-player row
+index in CSR form: <col>_rows.bin lists row positions grouped by player
+code, and <col>_offsets.bin[code:code + 2] bounds each player's slice.
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from metadata import ATTRIBUTES
+
+STORE_DIR = "deliveries"
+META_FILE = "meta.json"
+
+# Column -> on-disk dtype
+COLUMNS = {
+    "match": "int32",
+    "innings": "int8",
+    "over": "int16",
+    "phase": "int8",
+    "season": "int16",
+    "venue": "int16",
+    "batting_team": "int16",
+    "bowling_team": "int16",
+    "striker": "int32",
+    "non_striker": "int32",
+    "bowler": "int32",
+    "runs_off_bat": "int8",
+    "extras": "int8",
+    "legal": "int8",
+    "wicket_type": "int8",
+    "player_dismissed": "int32",
+    "striker_hand": "int8",
+    "bowler_type": "int8",
+    "bowler_arm": "int8",
+}
+
+# Coded column -> shared vocabulary (players and teams share one code space each)
+COLUMN_VOCABS = {
+    "match": "matches",
+    "phase": "phases",
+    "venue": "venues",
+    "batting_team": "teams",
+    "bowling_team": "teams",
+    "striker": "players",
+    "non_striker": "players",
+    "bowler": "players",
+    "wicket_type": "wicket_types",
+    "player_dismissed": "players",
+    "striker_hand": "batting_hand",
+    "bowler_type": "bowling_type",
+    "bowler_arm": "bowling_arm",
+}
+
+# Vocabularies fixed by metadata.py; their columns arrive already coded
+FIXED_VOCABS = ATTRIBUTES
+
+# Columns with a per-player row index
+ROW_INDEX_COLUMNS = ["striker", "bowler"]
+
+# Raw column each coded/derived store column is read from
+SOURCE_COLUMNS = {"match": "match_id"}
+
+
+def _encode(values: pd.Series, vocab: dict) -> np.ndarray:
+    """Map labels to stable integer codes, growing the vocabulary as needed."""
+    for v in values.dropna().unique():
+        if v not in vocab:
+            vocab[v] = len(vocab)
+    return values.map(vocab).fillna(-1).to_numpy()
+
+
+class DeliveryStoreWriter:
+    """Appends prepared delivery chunks for one format to a generation."""
+
+    def __init__(self, gen_dir: str, fmt: str):
+        self.fmt = fmt
+        self.dir = os.path.join(gen_dir, STORE_DIR, fmt)
+        os.makedirs(self.dir, exist_ok=True)
+        self.vocabs: dict[str, dict] = {name: {} for name in dict.fromkeys(COLUMN_VOCABS.values())}
+        for name, labels in FIXED_VOCABS.items():
+            self.vocabs[name] = {label: i for i, label in enumerate(labels)}
+        self.files = {col: open(os.path.join(self.dir, f"{col}.bin"), "wb") for col in COLUMNS}
+        self.rows = 0
+
+    def _column(self, df: pd.DataFrame, col: str) -> np.ndarray:
+        src = SOURCE_COLUMNS.get(col, col)
+        if col == "season":
+            dates = df["start_date"] if "start_date" in df else pd.Series("", index=df.index)
+            return pd.to_numeric(dates.astype(str).str[:4], errors="coerce").fillna(0).to_numpy()
+        values = df[src] if src in df else pd.Series(np.nan, index=df.index)
+        if COLUMN_VOCABS.get(col) in FIXED_VOCABS:
+            return values.fillna(-1).to_numpy()
+        if col in COLUMN_VOCABS:
+            return _encode(values, self.vocabs[COLUMN_VOCABS[col]])
+        return values.fillna(0).to_numpy()
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Append one prepared chunk (see process_data.prepare_deliveries)."""
+        for col, dtype in COLUMNS.items():
+            np.ascontiguousarray(self._column(df, col), dtype=dtype).tofile(self.files[col])
+        self.rows += len(df)
+
+    def _write_row_index(self, col: str) -> None:
+        """Group row positions by player code (stable, so each slice is sorted)."""
+        codes = np.fromfile(os.path.join(self.dir, f"{col}.bin"), dtype=COLUMNS[col])
+        players = len(self.vocabs[COLUMN_VOCABS[col]])
+        known = codes >= 0
+        rows = np.flatnonzero(known)[np.argsort(codes[known], kind="stable")]
+        offsets = np.zeros(players + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes[known], minlength=players), out=offsets[1:])
+        rows.astype(np.int64).tofile(os.path.join(self.dir, f"{col}_rows.bin"))
+        offsets.tofile(os.path.join(self.dir, f"{col}_offsets.bin"))
+
+    def close(self) -> None:
+        """Flush the column files, build the row index and write meta.json."""
+        for f in self.files.values():
+            f.close()
+        for col in ROW_INDEX_COLUMNS:
+            self._write_row_index(col)
+        with open(os.path.join(self.dir, META_FILE), "w") as f:
+            json.dump({
+                "format": self.fmt,
+                "rows": self.rows,
+                "columns": COLUMNS,
+                "column_vocabs": COLUMN_VOCABS,
+                "row_index": ROW_INDEX_COLUMNS,
+                "vocabs": {
+                    name: [str(label) for label in vocab]
+                    for name, vocab in self.vocabs.items()
+                },
+            }, f)
+
+
+class DeliveryStoreReader:
+    """Reads a player's rows back out of a format's store, decoded to labels."""
+
+    def __init__(self, store_dir: str):
+        self.dir = store_dir
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            meta = json.load(f)
+        self.rows: int = meta["rows"]
+        self.columns: dict[str, str] = meta["columns"]
+        self.column_vocabs: dict[str, str] = meta["column_vocabs"]
+        self.row_index: list[str] = meta.get("row_index", [])
+        self.labels: dict[str, list[str]] = meta["vocabs"]
+
+    def _memmap(self, name: str, dtype: str) -> np.ndarray:
+        path = os.path.join(self.dir, f"{name}.bin")
+        return np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) else np.empty(0, dtype=dtype)
+
+    def player_rows(self, col: str, names: list[str]) -> np.ndarray:
+        """Sorted row positions where `col` is any of `names`."""
+        if col not in self.row_index:
+            raise ValueError(f"{self.dir} has no row index for {col}")
+        codes = {label: i for i, label in enumerate(self.labels[self.column_vocabs[col]])}
+        offsets = self._memmap(f"{col}_offsets", "int64")
+        rows = self._memmap(f"{col}_rows", "int64")
+        parts = [rows[offsets[codes[n]]:offsets[codes[n] + 1]] for n in names if n in codes]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """
+        The given rows as a prepared delivery frame (labels, not codes,
+        NaN for missing), indexed by row position like the original chunks.
+        """
+        data = {}
+        for col, dtype in self.columns.items():
+            values = np.asarray(self._memmap(col, dtype)[rows])
+            vocab = self.column_vocabs.get(col)
+            if vocab and vocab not in FIXED_VOCABS:
+                # Code -1 picks the trailing NaN
+                values = np.array(self.labels[vocab] + [np.nan], dtype=object)[values]
+            data[col] = values
+        frame = pd.DataFrame(data, index=pd.Index(rows))
+        return frame.rename(columns=SOURCE_COLUMNS)
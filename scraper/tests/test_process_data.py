@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from process_data import prepare_deliveries, fold_bowling, _split, _spells
+
+
+def deliveries(bowler_of_over: dict[int, str]) -> pd.DataFrame:
+    """One T20 innings of dot balls, bowled over by over as given."""
+    rows = [
+        {"match_id": 1, "innings": 1, "ball": f"{over - 1}.{i}", "bowler": bowler,
+         "striker": "Batter", "batting_team": "A", "bowling_team": "B",
+         "runs_off_bat": 0, "extras": 0, "wides": np.nan, "wicket_type": np.nan, "player_dismissed": np.nan}
+        for over, bowler in sorted(bowler_of_over.items())
+        for i in range(1, 7)
+    ]
+    return prepare_deliveries(pd.DataFrame(rows), "t20is")
+
+
+def test_spells_of_bowlers_on_alternating_overs():
+    # X bowls 1,3,5,7,9 then (after a gap of three overs) 12,14,16,18,20;
+    # Y bowls every over in between
+    spell_overs = [1, 3, 5, 7, 9, 12, 14, 16, 18, 20]
+    df = deliveries({o: "X" if o in spell_overs else "Y" for o in range(1, 21)})
+    acc: dict = {}
+    fold_bowling(acc, df)
+    spells = {name: _spells(rows) for name, rows in _split(acc, "spell").items()}
+
+    assert spells["X"]["balls"] == [12, 12, 12, 12, 12, 0, 0, 0]
+    # Y's ten overs (2..10 even, 11, 13..19 odd) form one unbroken spell
+    assert spells["Y"]["balls"] == [6] * 7 + [18]